@@ -11,6 +11,7 @@ The config is split into 5 main sections:
 - object_config: Config for the object.
 - paths_config: Config for the paths.
 - output_config: Config for the output.
+- parallel_config: Config for the parallel workers.
 
 The config is then merged into a single config dictionary which is used to configure the Blender Object Generator.
 """
@@ -72,7 +73,11 @@ scene_config = {
     },
     "default_background": (1, 1, 1, 1),     # The default background colour
     "default_background_strength": 1,       # The default background strength
-    "engine": "CYCLES",                     # The rendering engine to use
+    "engine": "eevee",                      # The rendering engine to use (eevee or cycles)
+    "png_compression": 15,                  # The PNG compression of the rendered images (0-100, lower is faster)
+    "eevee": {
+        "taa_render_samples": 16            # The number of samples to use
+    },
     "grid": {
         "size": 40,                         # The size of each grid cell
         "spacing": 10,                      # The spacing of each grid cell
@@ -94,19 +99,21 @@ scene_config = {
     },
     "cycles": {
         "use_progressive_refine": False,    # Whether to use progressive refinement
-        "tile_size": 256,                   # The tile size of the rendering
+        "use_auto_tile": False,             # Whether to split the render into tiles (Only needed if the frame does not fit in GPU memory)
+        "tile_size": 2048,                  # The tile size of the rendering when tiling is enabled
         "use_persistent_data": True,        # Whether to use persistent data
-        "samples": 64,                      # The number of samples to use
         "use_adaptive_sampling": True,      # Whether to use adaptive sampling
-        "adaptive_threshold": 0.02,         # The adaptive threshold
-        "adaptive_min_samples": 64,         # Minimum samples before adaptive sampling kicks in
+        "adaptive_threshold": 0.1,          # The adaptive threshold (Noise left over is removed by the denoiser)
+        "adaptive_min_samples": 8,          # Minimum samples before adaptive sampling kicks in
         "use_denoising": True,              # Whether to use denoising
         "use_denoising_prefilter": True,    # Whether to use denoising prefilter
+        "denoiser": "OPTIX",                # The denoiser to use (OPTIX or OPENIMAGEDENOISE, OPTIX needs OptiX devices)
+        "compute_device_type": "OPTIX",     # The GPU compute backend (OPTIX, CUDA, HIP, METAL or ONEAPI), falls back to OPTIX, CUDA, HIP, ONEAPI, METAL
         "max_bounces": 4,                   # The maximum number of bounces
         "diffuse_bounces": 2,               # The number of diffuse bounces
         "glossy_bounces": 2,                # The number of glossy bounces
         "sample_clamp_indirect": 1.0,       # The sample clamp indirect
-        "sample_count": 128                 # The number of samples to use
+        "sample_count": 32                  # The maximum number of samples to use per pixel
     },
     "clip_start": 0.1,                      # The near clipping plane of the camera
     "clip_end": camera_config["position"]["z"] * 2  # The far clipping plane of the camera
@@ -140,7 +147,13 @@ paths_config = {
 dataset_config = {
     "train_ratio": 0.8,
     "test_ratio": 0.1,
-    "val_ratio": 0.1
+    "val_ratio": 0.1,
+    "copy_mode": "copy"                     # How split files are placed in the dataset (copy, link or symlink), links share the files so re-runs rewriting images change the dataset
+}
+
+# Parallel config
+parallel_config = {
+    "gpu_ids": []                          # GPU ids the workers are pinned to in turn (Empty list disables pinning)
 }
 
 # Merge the config dictionaries into a single config dictionary
@@ -151,5 +164,8 @@ config = {
     "object": object_config,
     "paths": paths_config,
     "dataset": dataset_config,
+    "parallel": parallel_config,
+    "cache_dir": "./.cache",                # The directory the asset indexes are kept in, created when needed
+    "seed": 0,                              # Base seed of the asset choices, lighting and placement, combined with each image's index
     "create_visualization": True
 }
\ No newline at end of file
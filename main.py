@@ -9,8 +9,9 @@ calculates their 2D bounding boxes, and exports them in YOLO format.
 import re
 import os
 import sys
-import argparse
+import logging
 from pathlib import Path
+from collections import defaultdict
 from contextlib import contextmanager
 
 # Add the script's directory to Python's path
@@ -23,9 +24,11 @@ import bpy
 
 # Local Imports
 from utils.logger_utils import create_logger, logger, add_run_separator
-from utils.asset_utils import get_models_and_classes, find_textures, check_directories
-from utils.dataset_utils import split_images, create_dataset_paths, copy_dataset_contents, create_yolo_yaml
+from utils.asset_utils import get_models_and_classes, find_textures, prefetch_assets, get_cached_assets
+from utils.dataset_utils import COPY_MODES, split_images, create_dataset_paths, copy_dataset_contents, create_yolo_yaml
 from utils.image_utils import generate_image
+from utils.scene_utils import RENDER_ENGINES, COMPUTE_DEVICE_TYPES, get_engine_identifier, setup_render_devices
+from utils.parallel_utils import get_worker_slice, launch_workers
 
 from config import config
 
@@ -40,11 +43,61 @@ from utils.exceptions import (
     ResourceError
 )
 
-# Initialize logger
-logger = create_logger()
+# Output paths, resolved once at start up
+IMAGES_DIR = os.path.abspath(config["paths"]["images"])
+LABELS_DIR = os.path.abspath(config["paths"]["labels"])
+VIS_DIR = os.path.abspath(config["paths"]["vis"])
+DATASET_PATH = Path("dataset")
 
-# Add initial separator for this run
-logger.info(add_run_separator())
+# Pattern of the image filenames, compiled once
+IMAGE_FILENAME_PATTERN = re.compile(r'image_(\d+)')
+
+# Separator used around the log section headers
+SEPARATOR = "=" * 40
+
+# Config values the generator reads and their expected types, checked in a single pass
+NUMBER = (int, float)
+REQUIRED_CONFIG_KEYS = (
+    (("camera", "position", "z"), NUMBER),
+    (("camera", "focal_length"), NUMBER),
+    (("camera", "clip_start"), NUMBER),
+    (("camera", "clip_end"), NUMBER),
+    (("scene", "resolution", "x"), int),
+    (("scene", "resolution", "y"), int),
+    (("scene", "resolution", "percentage"), int),
+    (("scene", "engine"), str),
+    (("scene", "png_compression"), int),
+    (("scene", "eevee", "taa_render_samples"), int),
+    (("scene", "grid", "size"), NUMBER),
+    (("scene", "default_background"), tuple),
+    (("scene", "default_background_strength"), NUMBER),
+    (("scene", "cycles", "use_auto_tile"), bool),
+    (("scene", "cycles", "tile_size"), int),
+    (("scene", "cycles", "sample_count"), int),
+    (("scene", "cycles", "use_denoising"), bool),
+    (("scene", "cycles", "use_denoising_prefilter"), bool),
+    (("scene", "cycles", "use_adaptive_sampling"), bool),
+    (("scene", "cycles", "adaptive_threshold"), NUMBER),
+    (("scene", "cycles", "adaptive_min_samples"), int),
+    (("scene", "cycles", "use_persistent_data"), bool),
+    (("scene", "cycles", "max_bounces"), int),
+    (("scene", "cycles", "diffuse_bounces"), int),
+    (("scene", "cycles", "glossy_bounces"), int),
+    (("scene", "cycles", "sample_clamp_indirect"), NUMBER),
+    (("scene", "cycles", "denoiser"), str),
+    (("scene", "cycles", "compute_device_type"), str),
+    (("object", "max_scale"), NUMBER),
+    (("object", "scale_variation_range"), tuple),
+    (("object", "max_collision_check_amount"), int),
+    (("object", "default_colour"), tuple),
+    (("dataset", "train_ratio"), NUMBER),
+    (("dataset", "test_ratio"), NUMBER),
+    (("dataset", "val_ratio"), NUMBER),
+    (("dataset", "copy_mode"), str),
+    (("parallel", "gpu_ids"), list),
+    (("cache_dir",), str),
+    (("seed",), int),
+)
 
 def get_unique_classes(models: list) -> list[str]:
     """
@@ -56,7 +109,7 @@ def get_unique_classes(models: list) -> list[str]:
     Returns:
         list[str]: List of unique class names
     """
-    return sorted(list(set(model[1] for model in models)))
+    return sorted({model[1] for model in models})
 
 def parse_starting_index(starting_filename: str) -> int:
     """
@@ -68,7 +121,7 @@ def parse_starting_index(starting_filename: str) -> int:
     Returns:
         int: The parsed index number
     """
-    match = re.search(r'image_(\d+)', starting_filename)
+    match = IMAGE_FILENAME_PATTERN.search(starting_filename)
     if match:
         return int(match.group(1))
     raise ValueError(f"Invalid filename format: {starting_filename}. Expected format: image_XXXXXX")
@@ -76,23 +129,66 @@ def parse_starting_index(starting_filename: str) -> int:
 @contextmanager
 def blender_context():
     """Context manager for Blender operations with cleanup."""
+    # Batch generation never undoes, so skip the undo steps pushed by every operator
+    edit_preferences = bpy.context.preferences.edit
+    use_global_undo = edit_preferences.use_global_undo
+    edit_preferences.use_global_undo = False
     try:
         yield
     finally:
-        # Cleanup Blender objects
-        for obj in bpy.data.objects:
-            try:
-                bpy.data.objects.remove(obj, do_unlink=True)
-            except Exception as e:
-                logger.warning(f"Failed to remove object {obj.name}: {e}")
+        edit_preferences.use_global_undo = use_global_undo
+        
+        # Cleanup Blender objects in a single call
+        try:
+            bpy.data.batch_remove(ids=tuple(bpy.data.objects))
+        except Exception as e:
+            logger.warning("Failed to remove objects: %s", e)
+
+def validate_config(engine: str = config["scene"]["engine"]):
+    """
+    Validate the configuration settings.
 
-def validate_config():
-    """Validate the configuration settings."""
+    Args:
+        engine (str): The name of the render engine the run uses ('eevee' or 'cycles').
+    """
     try:
-        # Check if all required paths exist
-        for path_name, path in config["paths"].items():
-            if not os.path.exists(path):
-                raise ConfigError(f"Required path does not exist: {path}")
+        # Check that all required values are present and of the right type
+        for keys, expected_type in REQUIRED_CONFIG_KEYS:
+            node = config
+            for key in keys:
+                if not isinstance(node, dict) or key not in node:
+                    raise ConfigError(f"Missing config value: {'.'.join(keys)}")
+                node = node[key]
+            if not isinstance(node, expected_type):
+                raise ConfigError(f"Invalid type for config value {'.'.join(keys)}: {type(node).__name__}")
+
+        # Check the values chosen from a fixed set, so a bad value fails here instead of on every image
+        allowed_values = (
+            ("scene.engine", config["scene"]["engine"], RENDER_ENGINES),
+            ("scene.cycles.compute_device_type", config["scene"]["cycles"]["compute_device_type"], COMPUTE_DEVICE_TYPES),
+            ("dataset.copy_mode", config["dataset"]["copy_mode"], COPY_MODES),
+        )
+        for name, value, allowed in allowed_values:
+            if value not in allowed:
+                raise ConfigError(f"Invalid value for config value {name}: {value!r}, expected one of {', '.join(allowed)}")
+
+        # Check if all required paths exist, listing each parent directory only once
+        paths_by_parent = defaultdict(list)
+        for path in config["paths"].values():
+            parent, name = os.path.split(os.path.normpath(path))
+            paths_by_parent[parent or "."].append((path, name))
+
+        for parent, entries in paths_by_parent.items():
+            try:
+                with os.scandir(parent) as it:
+                    present = {entry.name for entry in it}
+            except OSError:
+                # Unlistable parents are checked path by path below
+                present = set()
+            for path, name in entries:
+                # The listing never holds '.', '..' or '/' and is case sensitive, so check a miss with the file system
+                if name not in present and not os.path.exists(path):
+                    raise ConfigError(f"Required path does not exist: {path}")
         
         # Validate dataset ratios
         ratios = [
@@ -104,14 +200,27 @@ def validate_config():
             raise ConfigError("Dataset ratios must be between 0 and 1")
         if sum(ratios) != 1:
             raise ConfigError("Dataset ratios must sum to 1")
+
+        # The tile size is only used by Cycles with auto tiling, where GPUs work best with power of two tiles
+        tile_size = config["scene"]["cycles"]["tile_size"]
+        if tile_size < 1:
+            raise ConfigError("Cycles tile size must be positive")
+        if engine == "cycles" and config["scene"]["cycles"]["use_auto_tile"] and tile_size & (tile_size - 1):
+            logger.warning("Cycles tile size %d is not a power of two, which may render slower on GPUs", tile_size)
             
     except Exception as e:
         raise ConfigError(f"Configuration validation failed: {str(e)}")
 
-def validate_inputs(num_images: int, starting_filename: str = None):
+def validate_inputs(num_images: int, starting_filename: str = None, num_workers: int = 1, worker_id: int = None):
     """Validate input parameters."""
     if num_images < 1:
         raise ValidationError("Number of images must be greater than 0")
+
+    if num_workers < 1:
+        raise ValidationError("Number of workers must be greater than 0")
+
+    if worker_id is not None and not 0 <= worker_id < num_workers:
+        raise ValidationError(f"Worker id must be between 0 and {num_workers - 1}")
     
     if starting_filename:
         try:
@@ -119,19 +228,18 @@ def validate_inputs(num_images: int, starting_filename: str = None):
         except ValueError as e:
             raise ValidationError(f"Invalid starting filename: {str(e)}")
 
-def recover_from_error(error: Exception, current_index: int = None):
+def recover_from_error(error: Exception, current_index: int = None, engine: str = config["scene"]["engine"]):
     """Attempt to recover from an error and continue processing."""
     if isinstance(error, SceneError):
         logger.warning("Attempting to recover from scene error...")
         # Clear the current scene
-        bpy.ops.object.select_all(action='SELECT')
-        bpy.ops.object.delete()
+        bpy.data.batch_remove(ids=tuple(bpy.data.objects))
         return True
     
     elif isinstance(error, RenderingError):
         logger.warning("Attempting to recover from rendering error...")
-        # Reset render settings to defaults
-        bpy.context.scene.render.engine = 'CYCLES'
+        # Reset the render engine to the selected one
+        bpy.context.scene.render.engine = get_engine_identifier(engine)
         return True
     
     elif isinstance(error, ResourceError):
@@ -144,7 +252,14 @@ def recover_from_error(error: Exception, current_index: int = None):
     
     return False
 
-def main(num_images: int, visualise: bool, starting_filename: str = None, split: bool = False):
+def main(num_images: int,
+         visualise: bool,
+         starting_filename: str = None,
+         split: bool = False,
+         num_workers: int = 1,
+         worker_id: int = None,
+         engine: str = config["scene"]["engine"],
+         copy_mode: str = config["dataset"]["copy_mode"]):
     """
     Main function to run the entire pipeline.
 
@@ -153,122 +268,163 @@ def main(num_images: int, visualise: bool, starting_filename: str = None, split:
         visualise (bool): Whether to visualise the bounding boxes.
         starting_filename (str): Optional starting filename (e.g., 'image_xxxxxx')
         split (bool): Whether to split the dataset into train, test and val splits.
+        num_workers (int): The number of Blender processes to split the generation across.
+        worker_id (int): The id of this process when running as a worker. Workers only render their own slice.
+        engine (str): The name of the render engine to use ('eevee' or 'cycles').
+        copy_mode (str): How the split files are placed in the dataset ('copy', 'link' or 'symlink').
     """
     try:
         # Validate inputs
-        validate_inputs(num_images, starting_filename)
+        validate_inputs(num_images, starting_filename, num_workers, worker_id)
         
-        # Validate configuration
-        validate_config()
-
-        # Check if the directories exist
-        check_directories()
-
-        # Set the paths
-        images_dir = os.path.join(config["paths"]["images"])
-        labels_dir = os.path.join(config["paths"]["labels"])
-        logger.info(f"{'='*40} Directories {'='*40}")
-        logger.info(f"Images Directory: {images_dir}")
-        logger.info(f"Labels Directory: {labels_dir}")
+        # Validate configuration, this also checks that the output directories exist
+        validate_config(engine)
+
+        logger.info("%s Directories %s", SEPARATOR, SEPARATOR)
+        logger.info("Images Directory: %s", IMAGES_DIR)
+        logger.info("Labels Directory: %s", LABELS_DIR)
         
         try:
-            all_models = get_models_and_classes()
+            all_models = get_cached_assets(config["paths"]["models"], get_models_and_classes)
         except Exception as e:
             raise AssetError(f"Failed to load models: {str(e)}")
 
         unique_classes = get_unique_classes(all_models)
-        logger.info(f"{'='*40} Classes {'='*40}")
-        for class_name in unique_classes:
-            logger.info(f"Class: {class_name}")
-            
-        logger.info(f"{'='*40} Models {'='*40}")
-        for model in all_models:
-            logger.info("Model:")
-            logger.info(f"\tClass Index: {model[0]}")
-            logger.info(f"\tClass Name: {model[1]}")
-            logger.info(f"\tModel Path: {model[2]}")
+        # Only walk the asset lists when they will be logged
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s Classes %s", SEPARATOR, SEPARATOR)
+            for class_name in unique_classes:
+                logger.info("Class: %s", class_name)
+                
+            logger.info("%s Models %s", SEPARATOR, SEPARATOR)
+            for model in all_models:
+                logger.info("Model:")
+                logger.info("\tClass Index: %s", model[0])
+                logger.info("\tClass Name: %s", model[1])
+                logger.info("\tModel Path: %s", model[2])
 
         try:
-            all_textures = find_textures()
+            all_textures = get_cached_assets(config["paths"]["textures"], find_textures)
         except Exception as e:
             raise AssetError(f"Failed to load textures: {str(e)}")
 
-        logger.info(f"{'='*40} Textures {'='*40}")
-        for texture in all_textures:
-            logger.info(f"Path: {texture}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s Textures %s", SEPARATOR, SEPARATOR)
+            for texture in all_textures:
+                logger.info("Path: %s", texture)
 
         # Determine starting index
         start_index = 0
         if starting_filename:
             start_index = parse_starting_index(starting_filename)
-            logger.info(f"Starting from index: {start_index}")
-
-        # Generate the specified number of images
-        with blender_context():
-            for i in range(start_index, start_index + num_images):
-                try:
-                    generate_image(index=i,
-                                textures=all_textures,
-                                models=all_models,
-                                visualise=visualise)
-                except Exception as e:
-                    logger.error(f"Error generating image {i}: {e}")
-                    
-                    # Attempt to recover from the error
-                    if recover_from_error(e, i):
-                        logger.info(f"Successfully recovered from error, continuing with next image")
-                        continue
-                    else:
-                        logger.error(f"Failed to recover from error, skipping image {i}")
-                        continue
+            logger.info("Starting from index: %d", start_index)
+
+        if worker_id is None and num_workers > 1:
+            # Launch the workers and wait for all of them to finish
+            num_workers = min(num_workers, num_images)
+            logger.info("Splitting generation across %d workers", num_workers)
+            failed_workers = launch_workers(script_path=os.path.abspath(__file__),
+                                            num_images=num_images,
+                                            start_index=start_index,
+                                            num_workers=num_workers,
+                                            visualise=visualise,
+                                            engine=engine)
+            if failed_workers:
+                raise RenderingError(f"Workers failed: {failed_workers}")
+        else:
+            # Only render this worker's slice of the images
+            render_start, render_count = start_index, num_images
+            if worker_id is not None:
+                render_start, render_count = get_worker_slice(start_index, num_images, worker_id, num_workers)
+                logger.info("Worker %d rendering images %d to %d", worker_id, render_start, render_start + render_count - 1)
+
+            # Enable the GPUs once for the whole run
+            if engine == "cycles":
+                setup_render_devices()
+
+            # Choose and read the assets of the next images while the current one renders
+            # Each image's assets are seeded by its index, so the dataset does not depend on the number of workers
+            next_assets = prefetch_assets(all_textures, all_models, render_start, render_count, config["seed"])
+
+            # Generate the specified number of images
+            with blender_context():
+                for i, (texture_path, models) in zip(range(render_start, render_start + render_count), next_assets):
+                    try:
+                        generate_image(index=i,
+                                    texture_path=texture_path,
+                                    models=models,
+                                    visualise=visualise,
+                                    images_dir=IMAGES_DIR,
+                                    labels_dir=LABELS_DIR,
+                                    vis_dir=VIS_DIR,
+                                    engine=engine)
+                    except Exception as e:
+                        logger.error("Error generating image %d: %s", i, e)
+                        
+                        # Attempt to recover from the error
+                        if recover_from_error(e, i, engine):
+                            logger.info("Successfully recovered from error, continuing with next image")
+                            continue
+                        else:
+                            logger.error("Failed to recover from error, skipping image %d", i)
+                            continue
         
-        logger.info(f"Generation completed. Generated {num_images} images in {images_dir}")
-        logger.info(f"Labels saved to {labels_dir}")
+        logger.info("Generation completed. Generated %d images in %s", num_images, IMAGES_DIR)
+        logger.info("Labels saved to %s", LABELS_DIR)
 
-        if split:
+        # Only the launching process splits the dataset, after all workers are done
+        if split and worker_id is None:
             try:
-                logger.info(f"{'='*40} Splitting Dataset {'='*40}")
-                logger.info(f"Train Ratio: {config['dataset']['train_ratio']}")
-                logger.info(f"Test Ratio: {config['dataset']['test_ratio']}")
-                logger.info(f"Val Ratio: {config['dataset']['val_ratio']}")
+                logger.info("%s Splitting Dataset %s", SEPARATOR, SEPARATOR)
+                logger.info("Train Ratio: %s", config['dataset']['train_ratio'])
+                logger.info("Test Ratio: %s", config['dataset']['test_ratio'])
+                logger.info("Val Ratio: %s", config['dataset']['val_ratio'])
                 
                 splits = split_images(train_ratio=config["dataset"]["train_ratio"],
                             test_ratio=config["dataset"]["test_ratio"],
                             val_ratio=config["dataset"]["val_ratio"],
-                            images_path=Path(images_dir),
-                            labels_path=Path(labels_dir))
+                            images_path=Path(IMAGES_DIR),
+                            labels_path=Path(LABELS_DIR))
                             
                 create_dataset_paths()
-                copy_dataset_contents(dataset_path=Path("dataset"),
+                copy_dataset_contents(dataset_path=DATASET_PATH,
                                     splits=splits,
-                                    labels_path=Path(labels_dir))
+                                    labels_path=Path(LABELS_DIR),
+                                    mode=copy_mode)
                 
                 create_yolo_yaml(classes=unique_classes,
-                                dataset_path=Path("dataset"))
-                logger.info(f"Dataset split completed. Train: {len(splits['train'])}, Test: {len(splits['test'])}, Val: {len(splits['val'])}")
+                                dataset_path=DATASET_PATH)
+                logger.info("Dataset split completed. Train: %d, Test: %d, Val: %d", len(splits['train']), len(splits['test']), len(splits['val']))
             except Exception as e:
                 raise DatasetError(f"Failed to split dataset: {str(e)}")
         
     except BlenderGeneratorError as e:
-        logger.error(f"Blender Generator Error: {str(e)}")
+        logger.error("Blender Generator Error: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in main: {str(e)}")
+        logger.error("Unexpected error in main: %s", e)
         raise
 
 if __name__ == "__main__":
+    # Initialize logger
+    create_logger()
+
+    # Add initial separator for this run
+    logger.info(add_run_separator())
+
     # Handle Blender's argument passing
     argv = sys.argv
     
     if "--" in argv:
         # Get arguments after --
         argv = argv[argv.index("--") + 1:]
-        logger.info(f"Command line arguments received: {argv}")
+        logger.info("Command line arguments received: %s", argv)
     else:
         # No script arguments provided
         argv = []
     
-    # Add command line argument support
+    # Add command line argument support, only imported when running as a script
+    import argparse
     parser = argparse.ArgumentParser(description='Generate Blender scenes with bounding boxes in YOLO format')
     parser.add_argument('--num-images', type=int, default=1, 
                         help='Number of images to generate (default: 1)')
@@ -278,24 +434,32 @@ if __name__ == "__main__":
                         help='Starting filename (e.g., image_XXXXXX)')
     parser.add_argument('--split', action=argparse.BooleanOptionalAction, default=False,
                         help='Split the dataset into train, test and val splits (default: False)')
+    parser.add_argument('--engine', choices=list(RENDER_ENGINES), default=config["scene"]["engine"],
+                        help=f'Render engine to use (default: {config["scene"]["engine"]})')
+    parser.add_argument('--copy-mode', choices=list(COPY_MODES), default=config["dataset"]["copy_mode"],
+                        help=f'How the split files are placed in the dataset (default: {config["dataset"]["copy_mode"]})')
+    parser.add_argument('--num-workers', type=int, default=1,
+                        help='Number of Blender processes to split the generation across (default: 1)')
+    parser.add_argument('--worker-id', type=int,
+                        help='Id of this worker process, set by the launching process')
 
     try:
         # Parse arguments if provided, otherwise use defaults
         args = parser.parse_args(argv)
-        logger.info(f"Parsed arguments: {args}")
+        logger.info("Parsed arguments: %s", args)
         
         # Run main with better error handling
         try:
-            main(args.num_images, args.visualise, args.starting_filename, args.split)
+            main(args.num_images, args.visualise, args.starting_filename, args.split, args.num_workers, args.worker_id, args.engine, args.copy_mode)
         except BlenderGeneratorError as e:
-            logger.error(f"Blender Generator Error: {str(e)}")
+            logger.error("Blender Generator Error: %s", e)
             sys.exit(1)
         except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}")
+            logger.error("Unexpected error: %s", e)
             sys.exit(1)
             
     except Exception as e:
-        logger.error(f"Error parsing arguments: {e}")
+        logger.error("Error parsing arguments: %s", e)
 
         # If argument parsing fails, try with defaults
         try:
@@ -304,5 +468,5 @@ if __name__ == "__main__":
                  starting_filename=None,
                  split=False)
         except Exception as e:
-            logger.error(f"Error running main with defaults: {str(e)}")
+            logger.error("Error running main with defaults: %s", e)
             sys.exit(1) 
\ No newline at end of file
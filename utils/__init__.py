@@ -6,14 +6,15 @@ This package contains utility modules for the Blender Bounding Box Generator.
 
 from .lighting_utils import setup_lighting
 from .image_utils import generate_image
-from .asset_utils import find_textures, import_custom_model, check_directories, get_models_and_classes
+from .asset_utils import find_textures, import_custom_model, check_directories, get_models_and_classes, choose_assets, prefetch_assets, get_cached_assets
 from .object_utils import find_valid_position, apply_transformations
 from .logger_utils import create_logger, add_run_separator, logger
-from .camera_utils import create_camera, bpy_coords_to_pixel_coords
-from .scene_utils import clear_scene, setup_scene, create_textured_plane
+from .camera_utils import create_camera, bpy_coords_to_pixel_coords, get_camera_projection, project_to_pixel_coords, project_points_to_pixel_coords, project_points_to_extents
+from .scene_utils import clear_scene, setup_scene, create_textured_plane, ensure_scene, reset_frame_state
 from .bbox_utils import calculate_bounding_boxes, save_yolo_format, visualize_bounding_boxes
 from .dataset_utils import split_images, create_dataset_paths, copy_dataset_contents, create_yolo_yaml
 from .package_utils import check_package, install_package, ensure_packages
+from .parallel_utils import get_worker_slice, launch_workers
 
 __version__ = "2.1"
 __author__ = "Tarik Eren Tosun"
@@ -27,9 +28,15 @@ __all__ = [
     'setup_lighting',
     'import_custom_model',
     'create_textured_plane',
+    'ensure_scene',
+    'reset_frame_state',
     'find_valid_position',
     'apply_transformations',
     'bpy_coords_to_pixel_coords',
+    'get_camera_projection',
+    'project_to_pixel_coords',
+    'project_points_to_pixel_coords',
+    'project_points_to_extents',
     'calculate_bounding_boxes',
     'save_yolo_format',
     'visualize_bounding_boxes',
@@ -38,11 +45,16 @@ __all__ = [
     'create_logger',
     'add_run_separator',
     'check_directories',
+    'choose_assets',
+    'prefetch_assets',
+    'get_cached_assets',
     'split_images',
     'create_dataset_paths',
     'copy_dataset_contents',
     'create_yolo_yaml',
     'check_package',
     'install_package',
-    'ensure_packages'
+    'ensure_packages',
+    'get_worker_slice',
+    'launch_workers'
 ] 
\ No newline at end of file
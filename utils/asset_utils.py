@@ -1,7 +1,11 @@
 # Standard Library Imports
 import os
 import math
+import json
+import queue
+import hashlib
 import random
+import threading
 from pathlib import Path
 
 # Third Party Imports
@@ -14,6 +18,7 @@ from .scene_utils import clear_scene
 # Configuration
 from config import config
 
+
 def import_custom_model(model_path):
     """Import a custom 3D model into the scene."""
     logger.info(f"Attempting to import model from: {model_path}")
@@ -134,21 +139,34 @@ def find_textures() -> list[str]:
     Returns:
         List of paths to texture files
     """
-    texture_files = []
-    texture_extensions = ['.blend']  # Focus on .blend files for now
-    
-    # Walk through the directory and its subdirectories
-    for root, dirs, files in os.walk(config["paths"]["textures"]):
-        for file in files:
-            # Check if file has a texture extension
-            if any(file.lower().endswith(ext) for ext in texture_extensions):
-                # Get the full path to the texture file
-                texture_path = os.path.join(root, file)
-                # Convert to absolute path
-                texture_path = os.path.abspath(texture_path)
-                texture_files.append(texture_path)
-    
-    return texture_files
+    # Focus on .blend files for now
+    return list(scan_texture_files(os.path.abspath(config["paths"]["textures"])))
+
+def scan_texture_files(path: str):
+    """
+    Recursively yield the texture files of a directory.
+
+    os.scandir provides the file type of each entry from the directory listing itself,
+    so no directory listings are collected into lists and no extra stat calls are made.
+
+    Args:
+        path (str): Absolute path of the directory to search
+
+    Yields:
+        str: Absolute path of each texture file
+    """
+    try:
+        it = os.scandir(path)
+    except OSError as e:
+        # Skip unreadable directories like os.walk does
+        logger.warning(f"Could not scan texture directory {path}: {e}")
+        return
+    with it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_texture_files(entry.path)
+            elif entry.name.lower().endswith('.blend'):
+                yield entry.path
 
 def get_models_and_classes():
     """
@@ -167,7 +185,7 @@ def get_models_and_classes():
 
     # Get all model files
     model_files = []
-    for root, dirs, files in os.walk("./models"):
+    for root, dirs, files in os.walk(config["paths"]["models"]):
         for file in files:
             if any(file.lower().endswith(ext) for ext in model_extensions):
                 # Get the model path
@@ -197,8 +215,165 @@ def get_classes():
     ```
     The function will return a list of the class names.
     """
-    models_path = "./models" # Hardcoded path
+    models_path = config["paths"]["models"]
     classes = []
     for path in Path(models_path).glob('*/'):
         classes.append(path.name)    
-    return classes
\ No newline at end of file
+    return classes
+
+def choose_assets(textures: list[str],
+                  models: list[tuple[int, str, str]],
+                  rng: random.Random = random) -> tuple[str, list[tuple[int, str, str]]]:
+    """
+    Randomly choose the texture and the models of a single image.
+
+    Args:
+        textures (list[str]): The list of texture paths to choose from
+        models (list[tuple[int, str, str]]): The list of models to choose from
+        rng (random.Random): The random number generator to use
+
+    Returns:
+        tuple[str, list[tuple[int, str, str]]]: The texture path (None if there are no textures) and one model per object
+    """
+    if not textures:
+        return None, []
+
+    texture_path = rng.choice(textures)
+
+    # Randomly determine number of objects to generate (1-15)
+    num_objects = rng.randint(1, 15)
+    chosen_models = rng.choices(models, k=num_objects) if models else []
+
+    return texture_path, chosen_models
+
+def read_asset_file(path: str, chunk_size: int = 1 << 20) -> None:
+    """
+    Read a file and discard its contents so it is served from the OS cache when Blender loads it.
+
+    Args:
+        path (str): Path to the file to read
+        chunk_size (int): The number of bytes to read at once
+    """
+    try:
+        with open(path, 'rb') as f:
+            while f.read(chunk_size):
+                pass
+    except OSError as e:
+        logger.warning(f"Failed to prefetch asset {path}: {str(e)}")
+
+def prefetch_assets(textures: list[str],
+                    models: list[tuple[int, str, str]],
+                    start_index: int,
+                    count: int,
+                    seed: int,
+                    queue_size: int = 2):
+    """
+    Yield the assets of the next images, choosing and reading them from disk in a background thread.
+
+    Blender's data API is not thread safe, so the thread only reads the raw files. While an image
+    renders, the files of the next images are read into the OS cache which hides the disk latency
+    of loading them. Each file is only read once, Blender keeps the imported meshes and the loaded
+    materials between images so a file is not loaded from disk again.
+
+    Args:
+        textures (list[str]): The list of texture paths to choose from
+        models (list[tuple[int, str, str]]): The list of models to choose from
+        start_index (int): The index of the first image
+        count (int): The number of images to choose assets for
+        seed (int): The base seed, each image's choice is seeded by it and the image index
+        queue_size (int): The maximum number of images to prefetch ahead
+
+    Yields:
+        tuple[str, list[tuple[int, str, str]]]: The texture path and the models of each image
+    """
+    assets_queue = queue.Queue(maxsize=queue_size)
+
+    def worker():
+        prefetched = set()
+        try:
+            for index in range(start_index, start_index + count):
+                # Seed every image by its own index, so its assets do not depend on how the images are split between workers
+                rng = random.Random(hash((seed, index)))
+                texture_path, chosen_models = choose_assets(textures, models, rng)
+                paths = {model[2] for model in chosen_models}
+                if texture_path:
+                    paths.add(texture_path)
+                for path in paths - prefetched:
+                    read_asset_file(path)
+                prefetched |= paths
+                assets_queue.put((texture_path, chosen_models))
+        except BaseException as e:
+            # Hand the error to the consumer instead of leaving it waiting for the next image
+            assets_queue.put(e)
+
+    thread = threading.Thread(target=worker, name="AssetPrefetcher", daemon=True)
+    thread.start()
+
+    for _ in range(count):
+        assets = assets_queue.get()
+        if isinstance(assets, BaseException):
+            raise assets
+        yield assets
+
+def get_directory_signature(root: str) -> list:
+    """
+    Get a cheap signature of an asset directory which changes when its classes or asset folders change.
+
+    The signature holds the modification time of the root and of its top level directories, which
+    change when an entry is added to, removed from or renamed in them. Only the root is listed, so
+    checking the signature costs far less than the walk it replaces. Files added deeper in the tree
+    without adding a directory above them are not noticed, remove the index from the cache directory
+    to force a new walk.
+
+    Args:
+        root (str): Path to the directory
+
+    Returns:
+        list: The signature of the directory, made of JSON types so it compares equal after a round trip
+    """
+    root = os.path.abspath(root)
+    with os.scandir(root) as it:
+        entries = sorted([entry.name, entry.stat().st_mtime_ns] for entry in it if entry.is_dir())
+    return [root, os.stat(root).st_mtime_ns, entries]
+
+def get_cached_assets(root: str, find_assets):
+    """
+    Get the assets of a directory from its index cache, finding and caching them if the cache is stale.
+
+    The index is kept in the cache directory of the config, so nothing is written to the asset directories.
+
+    Args:
+        root (str): Path to the asset directory
+        find_assets: Function which walks the directory and returns its assets
+
+    Returns:
+        The assets returned by find_assets
+    """
+    signature = get_directory_signature(root)
+
+    # One index per asset directory, named after its absolute path
+    root_hash = hashlib.sha1(signature[0].encode()).hexdigest()[:16]
+    cache_path = Path(config["cache_dir"]) / f"assets_{Path(root).name}_{root_hash}.json"
+
+    # The index is stored as JSON, loading it can never run code
+    try:
+        cached = json.loads(cache_path.read_text())
+        if cached["signature"] == signature:
+            logger.debug(f"Using cached asset index: {cache_path}")
+            # JSON stores the model tuples as lists
+            return [tuple(asset) if isinstance(asset, list) else asset for asset in cached["assets"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    assets = find_assets()
+
+    # Write to a temporary file first so parallel workers never read a partial cache
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(json.dumps({"signature": signature, "assets": assets}))
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Failed to write asset index {cache_path}: {str(e)}")
+
+    return assets
@@ -5,16 +5,71 @@ This module contains utility functions for calculating and managing bounding box
 """
 
 # Standard Library Imports
+import warnings
+
+# Third Party Imports
 import cv2
+import numpy as np
 
 # Local Imports
 from .logger_utils import logger
-from .camera_utils import bpy_coords_to_pixel_coords
+from .camera_utils import get_camera_projection, project_points_to_extents
 from .asset_utils import get_classes
 
 # Configuration
 from config import config
 
+# BGR colours of the visualised boxes, cycled by class index
+CLASS_COLORS = (
+    (0, 0, 255),    # Red for class 0
+    (0, 255, 0),    # Green for class 1
+    (255, 0, 0),    # Blue for class 2
+    (255, 255, 0),  # Cyan for class 3
+    (255, 0, 255)   # Magenta for class 4
+)
+
+# Font of the visualised class labels
+LABEL_FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# Local vertex coordinates of the imported models by model path
+MODEL_VERTICES_CACHE = {}
+
+def get_mesh_vertices(mesh):
+    """Read the local coordinates of all vertices of a mesh.
+    
+    The coordinates are copied in a single call instead of one vertex at a time.
+    
+    Args:
+        mesh: The Blender mesh
+        
+    Returns:
+        Array of shape (N, 3) with the vertex coordinates
+    """
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coords)
+    return coords.reshape(-1, 3)
+
+def get_object_vertices(obj):
+    """Get the local coordinates of all vertices of an object.
+    
+    Every import of a model file produces the same local vertices (the object transform is
+    applied separately), so they are read once per model file and reused for later images.
+    
+    Args:
+        obj: The mesh object
+        
+    Returns:
+        Array of shape (N, 3) with the vertex coordinates
+    """
+    model_path = obj.get("model_path")
+    if model_path is None:
+        return get_mesh_vertices(obj.data)
+    
+    vertices = MODEL_VERTICES_CACHE.get(model_path)
+    if vertices is None:
+        vertices = MODEL_VERTICES_CACHE[model_path] = get_mesh_vertices(obj.data)
+    return vertices
+
 def calculate_bounding_boxes(scene, camera, objects):
     """Calculate 2D bounding boxes for 3D objects in the scene.
     
@@ -26,164 +81,170 @@ def calculate_bounding_boxes(scene, camera, objects):
     Returns:
         List of dictionaries containing bounding box data
     """
-    bounding_boxes = []
-    
     # Get render dimensions
     render = scene.render
     res_x = render.resolution_x
     res_y = render.resolution_y
     
+    # The camera does not move between objects, so the projection is computed once
+    projection = get_camera_projection(scene, camera)
+    
+    class_indices = []
+    extents = []
     for obj in objects:
         # Skip all background planes
         if obj.type == 'MESH' and obj.name.startswith("Background_Plane"):
             continue
             
-        # Get all vertices in world space
-        vertices = []
-        mesh = obj.data
-        for vertex in mesh.vertices:
-            # Convert vertex coordinates to world space
-            world_co = obj.matrix_world @ vertex.co
-            vertices.append(world_co)
-        
-        # Project vertices to 2D using the camera
-        bbox_2d = []
-        for vertex in vertices:
-            co_2d = bpy_coords_to_pixel_coords(scene, camera, vertex)
-            bbox_2d.append(co_2d)
-        
-        # Calculate min/max values for x and y coordinates
-        min_x = min(point[0] for point in bbox_2d)
-        max_x = max(point[0] for point in bbox_2d)
-        min_y = min(point[1] for point in bbox_2d)
-        max_y = max(point[1] for point in bbox_2d)
-        
-        # Ensure coordinates are within image bounds
-        min_x = max(0, min(min_x, res_x))
-        max_x = max(0, min(max_x, res_x))
-        min_y = max(0, min(min_y, res_y))
-        max_y = max(0, min(max_y, res_y))
-        
-        # Store bounding box and class index
-        class_idx = obj.get('class_idx', 0)
-        
-        # Calculate YOLO format (x_center, y_center, width, height) normalized to [0,1]
-        # YOLO format expects y to start from top, but Blender's coords start from bottom
-        # So we need to invert the y coordinates: y_normalized = 1 - y_normalized
-        x_center = (min_x + max_x) / 2 / res_x
-        y_center = 1 - (min_y + max_y) / 2 / res_y  # Inverted y-axis
-        width = (max_x - min_x) / res_x
-        height = (max_y - min_y) / res_y
+        # Get all vertices in local space
+        vertices = get_object_vertices(obj)
+        if not len(vertices):
+            continue
         
-        # Add a small padding to ensure the bounding box fully contains the object
-        padding = 0.01  # 1% padding
-        width = min(1.0, width * (1 + padding))
-        height = min(1.0, height * (1 + padding))
+        # Transform the vertices to world space, project them to 2D using the camera
+        # and calculate min/max values for x and y coordinates
+        extents.append(project_points_to_extents(projection, vertices, obj.matrix_world))
         
-        bounding_boxes.append({
+        # Store class index
+        class_indices.append(obj.get('class_idx', 0))
+    
+    if not extents:
+        return []
+    
+    # Ensure coordinates of all boxes (min_x, min_y, max_x, max_y) are within image bounds
+    extents = np.clip(np.stack(extents), 0, [res_x, res_y, res_x, res_y])
+    min_x, min_y, max_x, max_y = extents.T
+    
+    # Calculate YOLO format (x_center, y_center, width, height) normalized to [0,1]
+    # YOLO format expects y to start from top, but Blender's coords start from bottom
+    # So we need to invert the y coordinates: y_normalized = 1 - y_normalized
+    x_center = (min_x + max_x) / 2 / res_x
+    y_center = 1 - (min_y + max_y) / 2 / res_y  # Inverted y-axis
+    width = (max_x - min_x) / res_x
+    height = (max_y - min_y) / res_y
+    
+    # Add a small padding to ensure the bounding box fully contains the object
+    padding = 0.01  # 1% padding
+    width = np.minimum(1.0, width * (1 + padding))
+    height = np.minimum(1.0, height * (1 + padding))
+    
+    return [
+        {
             'class_idx': class_idx,
-            'x_center': x_center,
-            'y_center': y_center,
-            'width': width,
-            'height': height,
-            'min_x': min_x,
-            'min_y': min_y,
-            'max_x': max_x,
-            'max_y': max_y
-        })
-    
-    return bounding_boxes
+            'x_center': box[0],
+            'y_center': box[1],
+            'width': box[2],
+            'height': box[3],
+            'min_x': box[4],
+            'min_y': box[5],
+            'max_x': box[6],
+            'max_y': box[7]
+        }
+        for class_idx, box in zip(
+            class_indices,
+            np.column_stack((x_center, y_center, width, height, extents)).tolist()
+        )
+    ]
 
 def save_yolo_format(bounding_boxes, output_path):
     """Save bounding boxes in YOLO format.
     
+    The whole file is formatted in memory and written at once.
+    
     Args:
         bounding_boxes: List of bounding box dictionaries
         output_path: Path to save the YOLO format file
     """
+    # YOLO format: class_idx x_center y_center width height
+    # All values are normalized to [0,1]
+    content = "".join(
+        f"{box['class_idx']} {box['x_center']:.6f} {box['y_center']:.6f} {box['width']:.6f} {box['height']:.6f}\n"
+        for box in bounding_boxes
+    )
+    
     with open(output_path, 'w') as f:
-        for box in bounding_boxes:
-            # YOLO format: class_idx x_center y_center width height
-            # All values are normalized to [0,1]
-            f.write(f"{box['class_idx']} {box['x_center']:.6f} {box['y_center']:.6f} {box['width']:.6f} {box['height']:.6f}\n")
+        f.write(content)
 
-def visualize_bounding_boxes(image_path: str,
-                             bbox_file: str,
+def visualize_bounding_boxes(image,
+                             bboxes,
                              output_path: str) -> None:
     """Create a visualization of bounding boxes on the rendered image.
     
     Args:
-        image_path: Path to the rendered image
-        bbox_file: Path to the YOLO format bounding box file
+        image: Path to the rendered image, or the rendered image as a BGR array
+        bboxes: Path to the YOLO format bounding box file, or the list of bounding box
+            dictionaries returned by calculate_bounding_boxes
         output_path: Path to save the visualization
     """
-    # Read the image
-    img = cv2.imread(image_path)
-    if img is None:
-        logger.error(f"Could not read image: {image_path}")
-        return
+    # Read the image if it is not already in memory
+    if isinstance(image, np.ndarray):
+        img = image
+    else:
+        img = cv2.imread(image)
+        if img is None:
+            logger.error(f"Could not read image: {image}")
+            return
         
     # Get image dimensions
     height, width, _ = img.shape
     logger.debug(f"Image dimensions: {width}x{height}")
     
-    # Read YOLO format bounding boxes
-    try:
-        with open(bbox_file, 'r') as f:
-            lines = f.readlines()
-    except Exception as e:
-        logger.error(f"Error reading bbox file: {str(e)}")
+    # Get the YOLO format bounding boxes as a single (N, 5) array
+    if isinstance(bboxes, list):
+        # Use the boxes in memory instead of reading back the label file
+        data = np.array(
+            [(box['class_idx'], box['x_center'], box['y_center'], box['width'], box['height']) for box in bboxes],
+            dtype=np.float32
+        )
+    else:
+        try:
+            with warnings.catch_warnings():
+                # The label file of an image without objects is empty
+                warnings.simplefilter("ignore", UserWarning)
+                data = np.loadtxt(bboxes, dtype=np.float32, ndmin=2)
+        except Exception as e:
+            logger.error(f"Error reading bbox file: {str(e)}")
+            return
+    
+    if data.size == 0:
+        data = np.empty((0, 5), dtype=np.float32)
+    elif data.shape[1] != 5:
+        logger.error(f"Invalid bbox file, expected 5 values per line: {bboxes}")
         return
         
-    logger.debug(f"Found {len(lines)} bounding boxes to visualize")
-    
-    class_colors = [
-        [0, 0, 255],    # Red for class 0
-        [0, 255, 0],    # Green for class 1
-        [255, 0, 0],    # Blue for class 2
-        [255, 255, 0],  # Cyan for class 3
-        [255, 0, 255]   # Magenta for class 4
-    ]
+    logger.debug(f"Found {len(data)} bounding boxes to visualize")
+    
+    # Calculate (x1, y1) and (x2, y2) coordinates of all boxes at once
+    image_size = np.array([width, height], dtype=np.float32)
+    centers = data[:, 1:3] * image_size
+    sizes = data[:, 3:5] * image_size
+    corners = np.hstack((centers - sizes / 2, centers + sizes / 2)).astype(np.int32)
+    
+    # Ensure coordinates are within image bounds
+    np.clip(corners, 0, [width, height, width, height], out=corners)
+    
+    class_names = get_classes()
+    rectangle = cv2.rectangle
+    put_text = cv2.putText
     
     # Draw bounding boxes on the image
-    for line in lines:
-        parts = line.strip().split()
-        if len(parts) == 5:
-            try:
-                class_idx = int(parts[0])
-                x_center = float(parts[1]) * width
-                y_center = float(parts[2]) * height
-                box_width = float(parts[3]) * width
-                box_height = float(parts[4]) * height
-                
-                # Calculate (x1, y1) and (x2, y2) coordinates
-                x1 = int(x_center - box_width / 2)
-                y1 = int(y_center - box_height / 2)
-                x2 = int(x_center + box_width / 2)
-                y2 = int(y_center + box_height / 2)
-                
-                # Ensure coordinates are within image bounds
-                x1 = max(0, min(x1, width))
-                y1 = max(0, min(y1, height))
-                x2 = max(0, min(x2, width))
-                y2 = max(0, min(y2, height))
-                
-                # Get color for this class
-                color = class_colors[class_idx % len(class_colors)]
-                
-                # Draw rectangle
-                cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
-                
-                # Draw class label
-                class_name = get_classes()[class_idx]
-                cv2.putText(img, class_name, (x1, y1 - 10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
-                
-                logger.debug(f"Drew box for class {class_name} at ({x1}, {y1}) to ({x2}, {y2})")
-                
-            except Exception as e:
-                logger.error(f"Error processing bounding box line: {str(e)}")
-                continue
+    for class_idx, (x1, y1, x2, y2) in zip(data[:, 0].astype(np.int32).tolist(), corners.tolist()):
+        try:
+            # Get color for this class
+            color = CLASS_COLORS[class_idx % len(CLASS_COLORS)]
+            
+            # Draw rectangle
+            rectangle(img, (x1, y1), (x2, y2), color, 2)
+            
+            # Draw class label
+            class_name = class_names[class_idx]
+            put_text(img, class_name, (x1, y1 - 10), LABEL_FONT, 0.9, color, 2)
+            
+            logger.debug("Drew box for class %s at (%d, %d) to (%d, %d)", class_name, x1, y1, x2, y2)
+            
+        except Exception as e:
+            logger.error(f"Error processing bounding box: {str(e)}")
+            continue
     
     # Save annotated image
     try:
@@ -3,8 +3,15 @@ Camera Utilities for Blender Bounding Box Generator
 
 This module contains utility functions for camera setup and management in Blender.
 """
-# Standard Library Imports
+# Third Party Imports
 import bpy
+import numpy as np
+
+# Numba is optional, the projection falls back to NumPy without it
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # Configuration
 from config import config
@@ -28,31 +35,23 @@ def create_camera():
     
     return camera
 
-def bpy_coords_to_pixel_coords(scene, camera, coord):
-    """Convert 3D world coordinates to 2D pixel coordinates using the camera projection.
+def get_camera_projection(scene, camera):
+    """Precompute the constants of the camera projection for the current frame.
+    
+    Reading these through Blender's RNA and inverting the camera matrix is the expensive
+    part of a projection, so they are computed once and reused for every projected point.
     
     Args:
         scene: The Blender scene
         camera: The camera object
-        coord: 3D coordinate to project
         
     Returns:
-        Tuple of (x, y) pixel coordinates
+        Tuple of (world to camera matrix, x pixel scale, y pixel scale, x focal factor, y focal factor)
     """
     render = scene.render
     res_x = render.resolution_x
     res_y = render.resolution_y
     
-    # Convert world coordinates to camera view coordinates
-    co_local = camera.matrix_world.inverted() @ coord
-    
-    # Convert camera coordinates to normalized device coordinates
-    if co_local.z == 0:
-        # Avoid division by zero
-        co_local.z = 0.0001
-        
-    co_2d = (co_local.x / -co_local.z, co_local.y / -co_local.z)
-    
     # Convert normalized device coordinates to pixel coordinates
     render_scale = render.resolution_percentage / 100
     
@@ -60,7 +59,135 @@ def bpy_coords_to_pixel_coords(scene, camera, coord):
     camera_data = camera.data
     sensor_width = camera_data.sensor_width
     sensor_height = sensor_width * res_y / res_x
-    pixel_x = res_x * render_scale * (co_2d[0] * camera_data.lens / sensor_width + 0.5)
-    pixel_y = res_y * render_scale * (co_2d[1] * camera_data.lens / sensor_height + 0.5)
     
-    return (pixel_x, pixel_y) 
\ No newline at end of file
+    return (np.array(camera.matrix_world.inverted()),
+            res_x * render_scale,
+            res_y * render_scale,
+            camera_data.lens / sensor_width,
+            camera_data.lens / sensor_height)
+
+def project_points_to_pixel_coords(projection, points, matrix_world=None):
+    """Convert an array of 3D coordinates to 2D pixel coordinates using a precomputed camera projection.
+    
+    Args:
+        projection: The camera projection returned by get_camera_projection
+        points: Array of shape (N, 3) with the coordinates to project
+        matrix_world: Optional object to world matrix the points are transformed by before projecting
+        
+    Returns:
+        Array of shape (N, 2) with the (x, y) pixel coordinates
+    """
+    world_to_camera, scale_x, scale_y, focal_x, focal_y = projection
+    
+    # Combine the object and camera transforms so the points are only transformed once
+    matrix = world_to_camera
+    if matrix_world is not None:
+        matrix = matrix @ np.array(matrix_world)
+    
+    # Convert world coordinates to camera view coordinates
+    co_local = points @ matrix[:3, :3].T + matrix[:3, 3]
+    
+    # Convert camera coordinates to normalized device coordinates, avoiding division by zero
+    depth = co_local[:, 2]
+    depth = np.where(depth == 0, 0.0001, depth)
+    
+    pixels = np.empty((len(points), 2))
+    pixels[:, 0] = scale_x * (co_local[:, 0] / -depth * focal_x + 0.5)
+    pixels[:, 1] = scale_y * (co_local[:, 1] / -depth * focal_y + 0.5)
+    
+    return pixels
+
+def _project_extents(points, matrix, scale_x, scale_y, focal_x, focal_y):
+    """Project points and reduce them to their 2D extents in a single pass.
+    
+    Args:
+        points: Array of shape (N, 3) with the coordinates to project
+        matrix: The 4x4 matrix transforming the points to camera view coordinates
+        scale_x: Width of the render in pixels
+        scale_y: Height of the render in pixels
+        focal_x: Lens divided by the sensor width
+        focal_y: Lens divided by the sensor height
+        
+    Returns:
+        Tuple of (min_x, min_y, max_x, max_y) pixel coordinates
+    """
+    min_x = min_y = np.inf
+    max_x = max_y = -np.inf
+    for i in range(points.shape[0]):
+        x = points[i, 0]
+        y = points[i, 1]
+        z = points[i, 2]
+        
+        # Convert to camera view coordinates, avoiding division by zero
+        view_x = matrix[0, 0] * x + matrix[0, 1] * y + matrix[0, 2] * z + matrix[0, 3]
+        view_y = matrix[1, 0] * x + matrix[1, 1] * y + matrix[1, 2] * z + matrix[1, 3]
+        depth = matrix[2, 0] * x + matrix[2, 1] * y + matrix[2, 2] * z + matrix[2, 3]
+        if depth == 0:
+            depth = 0.0001
+        
+        pixel_x = scale_x * (view_x / -depth * focal_x + 0.5)
+        pixel_y = scale_y * (view_y / -depth * focal_y + 0.5)
+        min_x = min(min_x, pixel_x)
+        max_x = max(max_x, pixel_x)
+        min_y = min(min_y, pixel_y)
+        max_y = max(max_y, pixel_y)
+    return min_x, min_y, max_x, max_y
+
+if njit is not None:
+    # Only the fast math flags which keep infinities valid, the extents start at +-inf
+    _project_extents = njit(cache=True, fastmath={'contract', 'arcp'})(_project_extents)
+
+def project_points_to_extents(projection, points, matrix_world=None):
+    """Get the 2D pixel extents of an array of 3D coordinates using a precomputed camera projection.
+    
+    With Numba installed the projection and the reduction run as one compiled loop
+    without temporary arrays, otherwise they are done with NumPy.
+    
+    Args:
+        projection: The camera projection returned by get_camera_projection
+        points: Array of shape (N, 3) with the coordinates to project, N must be at least 1
+        matrix_world: Optional object to world matrix the points are transformed by before projecting
+        
+    Returns:
+        Tuple of (min_x, min_y, max_x, max_y) pixel coordinates
+    """
+    if njit is None:
+        pixels = project_points_to_pixel_coords(projection, points, matrix_world)
+        min_x, min_y = pixels.min(axis=0).tolist()
+        max_x, max_y = pixels.max(axis=0).tolist()
+        return min_x, min_y, max_x, max_y
+    
+    world_to_camera, scale_x, scale_y, focal_x, focal_y = projection
+    matrix = world_to_camera
+    if matrix_world is not None:
+        matrix = matrix @ np.array(matrix_world)
+    return _project_extents(points, matrix, scale_x, scale_y, focal_x, focal_y)
+
+def project_to_pixel_coords(projection, coord):
+    """Convert 3D world coordinates to 2D pixel coordinates using a precomputed camera projection.
+    
+    Args:
+        projection: The camera projection returned by get_camera_projection
+        coord: 3D coordinate to project
+        
+    Returns:
+        Tuple of (x, y) pixel coordinates
+    """
+    pixel_x, pixel_y = project_points_to_pixel_coords(projection, np.array([coord[:3]]))[0]
+    return (float(pixel_x), float(pixel_y))
+
+def bpy_coords_to_pixel_coords(scene, camera, coord):
+    """Convert 3D world coordinates to 2D pixel coordinates using the camera projection.
+    
+    When projecting many points, compute the projection once with get_camera_projection
+    and use project_points_to_pixel_coords instead.
+    
+    Args:
+        scene: The Blender scene
+        camera: The camera object
+        coord: 3D coordinate to project
+        
+    Returns:
+        Tuple of (x, y) pixel coordinates
+    """
+    return project_to_pixel_coords(get_camera_projection(scene, camera), coord)
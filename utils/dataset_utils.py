@@ -1,11 +1,33 @@
+import os
+import errno
 import random
 import shutil
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 from tqdm import tqdm
 
 from .logger_utils import logger
 
+def list_files(path: Path, extension: str) -> list[Path]:
+    """
+    Lists the files of a directory with the given extension
+
+    os.scandir provides the file type of each entry from the directory listing itself,
+    and Path objects are only created for the matching files.
+
+    Args:
+        path (Path): Path to the directory
+        extension (str): The extension of the files to list (e.g. '.png')
+
+    Returns:
+        list[Path]: The matching files, sorted by name
+    """
+    with os.scandir(path) as it:
+        names = sorted(entry.name for entry in it
+                       if entry.name.endswith(extension) and entry.is_file())
+    return [path / name for name in names]
+
 def split_images(train_ratio: float,
                  test_ratio: float,
                  val_ratio: float,
@@ -30,10 +52,10 @@ def split_images(train_ratio: float,
         raise ValueError("Train ratio cannot be less than or equal to 0")
     
     # All image extensions are .png by default
-    all_images = list(images_path.glob("*.png"))
+    all_images = list_files(images_path, ".png")
 
     # All label extensions are .txt by default
-    all_labels = list(labels_path.glob("*.txt"))
+    all_labels = list_files(labels_path, ".txt")
 
     if len(all_images) != len(all_labels):
         raise ValueError(f"Length of all images ({len(all_images)}) is not equal to the length of all labels ({len(all_labels)}). Please check the dataset for unlabeled images before proceeding.")
@@ -85,20 +107,66 @@ def create_dataset_paths(sub_paths: list[str] = ["images", "labels"], splits: li
     for path in sub_paths:
         for split in splits:
             new_dir = dataset_path / path / split
-            if Path.exists(new_dir):
-                logger.info(f"Directory '{new_dir}' already exists, skipping creation")
-            else:
-                new_dir.mkdir(parents=True, exist_ok=True)
+            # Let mkdir report an existing directory instead of checking for it first
+            try:
+                new_dir.mkdir(parents=True)
                 logger.info(f"Created directory: '{new_dir}'")
+            except FileExistsError:
+                logger.info(f"Directory '{new_dir}' already exists, skipping creation")
+
+# Ways a file can be placed in the dataset
+COPY_MODES = ("copy", "link", "symlink")
+
+def copy_file(src: Path, dst: Path, mode: str = "copy") -> None:
+    """
+    Places a single file at the destination path
 
-def copy_dataset_contents(dataset_path: Path, splits: dict[str, list[Path]], labels_path: Path) -> None:
+    Hard links only add a directory entry instead of copying the data, they fall back
+    to a copy when the source and destination are on different file systems.
+
+    Args:
+        src (Path): Path to the source file
+        dst (Path): Path to the destination file
+        mode (str): 'copy' to copy the file, 'link' to hard link it or 'symlink' to symbolically link it
+
+    Returns:
+        None
+    """
+    # Remove the file of an earlier split first, links cannot replace an existing file and
+    # copying onto a link of the source itself fails
+    dst.unlink(missing_ok=True)
+    if mode == "copy":
+        shutil.copy2(src, dst)
+        return
+
+    if mode == "symlink":
+        os.symlink(src.resolve(), dst)
+        return
+
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copy2(src, dst)
+
+def copy_dataset_contents(dataset_path: Path,
+                          splits: dict[str, list[Path]],
+                          labels_path: Path,
+                          max_workers: int = 8,
+                          mode: str = "copy") -> None:
     """
     Copies the dataset contents to the target
 
+    The copies are I/O bound, so they run on a thread pool to keep several of them in flight.
+    shutil.copy2 already uses the kernel's zero-copy path (os.sendfile) on Linux.
+
     Args:
         dataset_path (Path): Path to the root dataset folder
         splits (dict[str, list[Path]]): Dictionary containing the dataset splits
         labels_path (Path): Path to the labels
+        max_workers (int): Maximum number of files copied at the same time
+        mode (str): How the files are placed in the dataset ('copy', 'link' or 'symlink')
 
     Returns:
         None
@@ -108,11 +176,15 @@ def copy_dataset_contents(dataset_path: Path, splits: dict[str, list[Path]], lab
     for key in required_keys:
         if key not in splits:
             raise ValueError(f"Missing key: {key}")
+
+    if mode not in COPY_MODES:
+        raise ValueError(f"Invalid copy mode: {mode}, expected one of {COPY_MODES}")
         
-    # Copy all files
+    # Check the labels of all splits before copying anything
+    copies_by_split = {}
     for split, img_list in splits.items():
-        logger.info(f"Processing {split} split:")
-        for img_path in tqdm(img_list, desc=f"{split}", unit="files"):
+        copies = copies_by_split[split] = []
+        for img_path in img_list:
 
             # Get the label using the image path name
             lbl_path = labels_path / (img_path.stem + '.txt')
@@ -123,9 +195,18 @@ def copy_dataset_contents(dataset_path: Path, splits: dict[str, list[Path]], lab
             dst_img = dataset_path / "images" / split / img_path.name
             dst_lbl = dataset_path / "labels" / split / lbl_path.name
 
+            copies.append((img_path, dst_img))
+            copies.append((lbl_path, dst_lbl))
+
+    # Copy all files
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for split, copies in copies_by_split.items():
+            logger.info(f"Processing {split} split:")
+
             # Copy the images and labels to the destination paths
-            shutil.copy2(img_path, dst_img)
-            shutil.copy2(lbl_path, dst_lbl)
+            for _ in tqdm(pool.map(lambda copy: copy_file(*copy, mode), copies),
+                          total=len(copies), desc=f"{split}", unit="files"):
+                pass
 
 def create_yolo_yaml(classes: list[str], dataset_path: Path) -> None:
     """
@@ -137,19 +218,14 @@ def create_yolo_yaml(classes: list[str], dataset_path: Path) -> None:
     Returns:
         None
     """
+    # YAML does not allow tabs for indentation, so the class names are indented with spaces
+    class_lines = "".join(f"  {i}: {class_name}\n" for i, class_name in enumerate(classes))
 
-    class_dict = {}
-    for i in range(len(classes)):
-        class_dict[f"{i}"] = classes[i]
-
-    with open(dataset_path / "data.yaml", "w") as file:
-        file.write(f"""path: {dataset_path}     # The dataset root
+    (dataset_path / "data.yaml").write_text(f"""path: {dataset_path}     # The dataset root
 
 train: {dataset_path / "train"}     # Path to train
 test: {dataset_path / "test"}       # Path to test
 val: {dataset_path / "val"}         # Path to val
 
 names:  # Class names
-""")
-        for item in class_dict:
-            file.write(f"\t{item}: {class_dict[item]}\n")
\ No newline at end of file
+{class_lines}""")
@@ -6,122 +6,189 @@ This module contains the main image generation function and related utilities.
 # Standard Library Imports
 import os
 import random
+from collections import defaultdict
 
 # Third Party Imports
 import bpy
+import numpy as np
 
 # Local Imports
 from .logger_utils import logger
-from .camera_utils import create_camera
 from .lighting_utils import setup_lighting
 from .object_utils import apply_transformations
-from .scene_utils import clear_scene, setup_scene, create_textured_plane
+from .scene_utils import ensure_scene, reset_frame_state, set_ground_material
 from .bbox_utils import calculate_bounding_boxes, save_yolo_format, visualize_bounding_boxes
 
 # Configuration
 from config import config
 
+# Names of the meshes of the imported models by model path, kept between images
+MODEL_MESHES = {}
+
+def import_model(model_path: str):
+    """
+    Add an object of a model to the scene.
+
+    A model file is only imported the first time it is used. Its mesh is kept between images
+    and the later objects of the model share it, so they skip the import and Cycles instances them.
+
+    Args:
+        model_path (str): Path to the model file.
+
+    Returns:
+        The object of the model.
+    """
+    mesh = bpy.data.meshes.get(MODEL_MESHES.get(model_path, ""))
+    if mesh is not None and mesh.get("model_path") == model_path:
+        obj = bpy.data.objects.new(mesh.name, mesh)
+        bpy.context.collection.objects.link(obj)
+        return obj
+
+    # Deselect all objects to merge the newly imported objects
+    bpy.ops.object.select_all(action='DESELECT')
+    bpy.ops.wm.obj_import(
+        filepath=model_path,
+        use_split_objects=False,
+        use_split_groups=False,
+    )
+    object_to_merge = [o for o in bpy.context.selected_objects if o.type == 'MESH']
+
+    # Check if they need merging, merge if necessary
+    if len(object_to_merge) > 1:
+        bpy.context.view_layer.objects.active = object_to_merge[0]
+        bpy.ops.object.join()
+    else:
+        object_to_merge = bpy.context.selected_objects
+
+    obj = object_to_merge[0]
+    if obj.type == 'MESH':
+        # Keep the mesh when the objects of the image are removed
+        obj.data["model_path"] = model_path
+        obj.data.use_fake_user = True
+        MODEL_MESHES[model_path] = obj.data.name
+    return obj
+
+def read_render_result(scene):
+    """
+    Read the last render from the compositor viewer as an 8-bit BGR image.
+
+    Args:
+        scene: The Blender scene that was rendered.
+
+    Returns:
+        The image as an array of shape (height, width, 3), None if the viewer image is not available.
+    """
+    viewer = bpy.data.images.get("Viewer Node")
+    if viewer is None:
+        return None
+
+    render = scene.render
+    width, height = viewer.size
+    scale = render.resolution_percentage / 100
+    if (width, height) != (int(render.resolution_x * scale), int(render.resolution_y * scale)):
+        return None
+
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    viewer.pixels.foreach_get(pixels)
+
+    # Blender stores the rows bottom to top, OpenCV expects them top to bottom
+    rgb = np.clip(pixels.reshape(height, width, 4)[::-1, :, :3], 0.0, 1.0)
+
+    # The viewer holds scene linear values, apply the sRGB transform of the Standard view transform
+    srgb = np.where(rgb <= 0.0031308, rgb * 12.92, 1.055 * np.power(rgb, 1 / 2.4) - 0.055)
+    return np.ascontiguousarray(srgb[:, :, ::-1] * 255 + 0.5, dtype=np.uint8)
+
 def generate_image(index: int,
-                   textures: list[str],
+                   texture_path: str,
                    models: list[tuple[int, str, str]],
-                   visualise: bool) -> None: 
+                   visualise: bool,
+                   images_dir: str,
+                   labels_dir: str,
+                   vis_dir: str,
+                   engine: str = "eevee") -> None: 
     """
     Generate a single image with bounding boxes.
 
     Args:
         index (int): The index of the image to generate.
-        textures (list[str]): The list of texture paths to use.
-        models (list[str]): The list of model paths to use.
+        texture_path (str): The texture path to use, None if no textures are available.
+        models (list[tuple[int, str, str]]): The models to place in the scene, one per object.
         visualise (bool): Whether to visualise the labels on the image.
+        images_dir (str): Absolute path to the images directory.
+        labels_dir (str): Absolute path to the labels directory.
+        vis_dir (str): Absolute path to the visualisations directory.
+        engine (str): The name of the render engine to use ('eevee' or 'cycles').
     """
-    # Convert relative paths to absolute paths
-    images_dir_abs = os.path.abspath(config["paths"]["images"])
-    labels_dir_abs = os.path.abspath(config["paths"]["labels"])
-
     # Set up filenames for this image
     image_filename = f"image_{index:06d}.png"
     label_filename = f"image_{index:06d}.txt"
 
     logger.info(f"Generating image: {image_filename} and label: {label_filename}")
     
-    render_path = os.path.join(images_dir_abs, image_filename)
-    label_path = os.path.join(labels_dir_abs, label_filename)
+    render_path = os.path.join(images_dir, image_filename)
+    label_path = os.path.join(labels_dir, label_filename)
     
     try:
-        # Clear the scene
-        clear_scene()
-        
-        # Setup scene
-        scene = setup_scene()
+        # Setup scene, the camera and ground planes are kept between images
+        scene, camera, planes = ensure_scene(engine)
         scene.render.filepath = render_path
         
-        # Create camera
-        camera = create_camera()
+        # Setup randomized lighting seeded from the base seed and the image index
+        # Lighting and object placement share a generator, so each image only depends on its index.
+        # The extra term keeps it apart from the asset choices drawn with the same seed and index
+        rng = random.Random(hash((config["seed"], index, 1)))
+        setup_lighting(rng=rng)
         
-        # Setup randomized lighting using the image index as seed
-        setup_lighting(seed=index+100)
-        
-        # Randomly select a texture if available
-        texture_path = None
-        if textures:
-            texture_path = random.choice(textures)
+        # Use the selected texture if available
+        if texture_path:
             logger.info(f"Using texture: {texture_path}")
         
-            # Create textured plane
-            create_textured_plane(texture_path)
+            # Apply the texture to the ground planes
+            set_ground_material(planes, texture_path)
+
+            if not models:
+                logger.error("No models provided")
+                raise ValueError("No models provided")
 
-            # Randomly determine number of objects to generate (1-15)
-            num_objects = random.randint(1, 15)
+            num_objects = len(models)
             logger.info(f"Generating {num_objects} objects for this image")
 
-            imported_objects = []
+            # Placed objects grouped by grid cell for the collision checks
+            occupancy = defaultdict(list)
+            placed_objects = []
             
             # Generate the specified number of objects
-            for obj_idx in range(num_objects):
-                if models:
-                    model = random.choice(models)
-                    model_class_idx = model[0]
-                    model_class_name = model[1]
-                    model_path = model[2]
-                    logger.info(f"Object {obj_idx + 1}/{num_objects} using model:\n\tpath: {model_path}\n\tclass name: {model_class_name}\n\tclass index: {model_class_idx}")
-                else:
-                    logger.error("No models provided")
-                    raise ValueError("No models provided")
+            for obj_idx, model in enumerate(models):
+                model_class_idx = model[0]
+                model_class_name = model[1]
+                model_path = model[2]
+                # Lazy formatting, the message is only built when debug logging is enabled
+                logger.debug("Object %d/%d using model:\n\tpath: %s\n\tclass name: %s\n\tclass index: %s",
+                             obj_idx + 1, num_objects, model_path, model_class_name, model_class_idx)
                 
-                # Import models
-                # Deselect all objects to merge the newly imported objects
-                bpy.ops.object.select_all(action='DESELECT')
-                bpy.ops.wm.obj_import(
-                    filepath=model_path,
-                    use_split_objects=False,
-                    use_split_groups=False,
-                )
-                object_to_merge = [o for o in bpy.context.selected_objects if o.type == 'MESH']
-            
-                # Check if they need merging, merge if necessary
-                if len(object_to_merge) > 1:
-                    bpy.context.view_layer.objects.active = object_to_merge[0]
-                    bpy.ops.object.join()
-                else:
-                    object_to_merge = bpy.context.selected_objects
-
-                obj = object_to_merge[0]
+                # Import the model, or instance it if it was imported before
+                obj = import_model(model_path)
 
                 # Set the class index
                 obj["class_idx"] = model_class_idx
                 obj["class_name"] = model_class_name
+                obj["model_path"] = model_path
 
                 # Apply transformations
-                apply_transformations(obj, imported_objects)
-                imported_objects.append(obj)
+                if apply_transformations(obj, occupancy, rng) is not None:
+                    placed_objects.append(obj)
+
+            logger.info(f"Placed {len(placed_objects)}/{num_objects} objects")
 
-        # Get fresh list of objects for bounding box calculation
-        current_objects = [obj for obj in bpy.data.objects if obj.type == 'MESH']
-        if not current_objects:
+        # Evaluate the transformations of the whole scene once, before the world matrices are read
+        bpy.context.view_layer.update()
+        
+        # Objects are only placed on a textured ground
+        if not texture_path:
             raise ValueError("No valid objects found for bounding box calculation")
                 
-        # Calculate bounding boxes
-        bounding_boxes = calculate_bounding_boxes(scene, camera, current_objects)
+        # Calculate bounding boxes of the placed objects
+        bounding_boxes = calculate_bounding_boxes(scene, camera, placed_objects)
 
         # Save bounding boxes
         save_yolo_format(bounding_boxes, label_path)
@@ -131,8 +198,10 @@ def generate_image(index: int,
         logger.info(f"Image {index+1} rendered to: {render_path}")
 
         if visualise:
-            visualization_path = os.path.join(config["paths"]["vis"], f"vis_{index:06d}.png")
-            visualize_bounding_boxes(render_path, label_path, visualization_path)
+            visualization_path = os.path.join(vis_dir, f"vis_{index:06d}.png")
+            # Fall back to reading the saved render if the viewer image is not available
+            image = read_render_result(scene)
+            visualize_bounding_boxes(render_path if image is None else image, bounding_boxes, visualization_path)
             logger.info(f"Visualization saved to: {visualization_path}")
         else:
             logger.info("Skipped visualisation")
@@ -141,9 +210,9 @@ def generate_image(index: int,
     except FileNotFoundError as e:
         logger.error(f"Error in image generation: {e}")
     finally:
-        # Always try to clean up
+        # Always try to clean up the objects of this image
         try:
-            clear_scene()
+            reset_frame_state()
         except Exception as e:
             logger.error(f"Error in cleanup: {e}")
 
@@ -1,6 +1,9 @@
 # Standard Library Imports
 import sys
+import queue
+import atexit
 import logging
+import logging.handlers
 
 # Create a default logger instance
 logger = logging.getLogger(__name__)
@@ -8,14 +11,29 @@ logger = logging.getLogger(__name__)
 def create_logger():
     """
     Create a logger for the program.
+
+    Records are put on a queue and written to the log file and stdout by a listener thread,
+    so logging calls do not wait on disk writes.
     Returns:
         logger: The logger for the program.
     """
+    # Hand the records to the listener thread through a queue
+    log_queue = queue.Queue(-1)
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [logging.FileHandler('blender_generator.log'), logging.StreamHandler(sys.stdout)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+
+    # Flush the remaining records on exit
+    atexit.register(listener.stop)
+
     # Configure logging
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[logging.FileHandler('blender_generator.log'), logging.StreamHandler(sys.stdout)]
+        handlers=[logging.handlers.QueueHandler(log_queue)]
     )
 
     # Return the logger
@@ -32,4 +50,4 @@ def add_run_separator():
     run_header = " New Execution "
 
     # Return the separator
-    return separator + run_header + separator
\ No newline at end of file
+    return separator + run_header + separator
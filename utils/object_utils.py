@@ -14,48 +14,88 @@ import bpy
 from config import config
 from .logger_utils import logger
 
-def is_colliding(position, existing_objects, min_distance=3.0):
-    """Check if a position would collide with existing objects.
+def get_collision_cell_size(min_distance=3.0):
+    """Get the cell size of the occupancy grid used for collision checks.
+    
+    The cell size is the largest distance an object can keep others away from, so a
+    colliding object is always in the same or a neighbouring cell.
     
     Args:
-        position: Tuple of (x, y, z) coordinates
-        existing_objects: List of existing objects
         min_distance: Minimum distance required between objects
         
     Returns:
-        True if collision would occur, False otherwise
+        The size of a single grid cell
     """
-    for obj in existing_objects:
-        # Get object dimensions and center
-        obj_dims = obj.dimensions
-        obj_center = obj.location
-        
-        # Calculate the maximum dimension of the object
-        max_obj_dim = max(obj_dims.x, obj_dims.y)
-        
-        # Calculate distance between centers in 3D space
-        distance = math.sqrt(
-            (position[0] - obj_center.x)**2 + 
-            (position[1] - obj_center.y)**2 +
-            0
-        )
+    # Objects are scaled so that their largest dimension is at most this value
+    max_obj_dim = config["object"]["max_scale"] * config["object"]["scale_variation_range"][1]
+    return max(min_distance, max_obj_dim * 1.5)
+
+def get_cell_key(position, cell_size):
+    """Get the key of the occupancy grid cell containing a position.
+    
+    Args:
+        position: Tuple of (x, y, z) coordinates
+        cell_size: The size of a single grid cell
         
-        # Calculate minimum required distance based on object dimensions
-        # Add a buffer to ensure objects don't get too close
-        min_required_distance = max(
-            min_distance,
-            max_obj_dim * 1.5  # Use 1.5 times the maximum dimension as minimum distance
-        )
+    Returns:
+        Tuple of the integer (x, y) grid coordinates
+    """
+    return (int(position[0] // cell_size), int(position[1] // cell_size))
+
+def add_to_occupancy(occupancy, position, dimensions, min_distance=3.0):
+    """Add a placed object to the occupancy grid.
+    
+    Args:
+        occupancy: Dict mapping grid cell keys to the objects placed in them
+        position: Tuple of (x, y, z) coordinates of the object center
+        dimensions: Tuple of the (x, y, z) dimensions of the object
+        min_distance: Minimum distance required between objects
+    """
+    # Calculate minimum required distance based on object dimensions
+    # Add a buffer to ensure objects don't get too close
+    min_required_distance = max(
+        min_distance,
+        max(dimensions[0], dimensions[1]) * 1.5  # Use 1.5 times the maximum dimension as minimum distance
+    )
+    
+    key = get_cell_key(position, get_collision_cell_size(min_distance))
+    occupancy[key].append((position[0], position[1], min_required_distance * min_required_distance))
+
+def is_colliding(position, occupancy, cell_size):
+    """Check if a position would collide with existing objects.
+    
+    Only the objects in the cell of the position and its neighbouring cells are checked.
+    
+    Args:
+        position: Tuple of (x, y, z) coordinates
+        occupancy: Dict mapping grid cell keys to the objects placed in them
+        cell_size: The size of a single grid cell
         
-        if distance < min_required_distance:
-            return True
+    Returns:
+        True if collision would occur, False otherwise
+    """
+    # Nothing to collide with for the first object of an image
+    if not occupancy:
+        return False
+    
+    x, y = position[0], position[1]
+    cell_x, cell_y = get_cell_key(position, cell_size)
+    for offset_x in (-1, 0, 1):
+        for offset_y in (-1, 0, 1):
+            for obj_x, obj_y, min_required_distance_sq in occupancy.get((cell_x + offset_x, cell_y + offset_y), ()):
+                # Compare squared distances between centers to avoid the square root
+                dx = x - obj_x
+                dy = y - obj_y
+                if dx * dx + dy * dy < min_required_distance_sq:
+                    return True
     return False
 
-def find_valid_position(existing_objects):
+def find_valid_position(occupancy, rng=random):
     """Find a valid position that doesn't collide with existing objects.
     
     Args:
-        existing_objects: List of existing objects
+        occupancy: Dict mapping grid cell keys to the objects placed in them
+        rng: Random number generator to use
         
     Returns:
         Tuple of (x, y, z) coordinates if valid position found, None otherwise
@@ -74,56 +114,79 @@ def find_valid_position(existing_objects):
         'y_max': half_grid - edge_buffer,   # Half of scene grid size with buffer
     }
     
+    x_min, x_max = CAMERA_BOUNDS['x_min'], CAMERA_BOUNDS['x_max']
+    y_min, y_max = CAMERA_BOUNDS['y_min'], CAMERA_BOUNDS['y_max']
+    cell_size = get_collision_cell_size()
+    
+    # Bind to a local to skip the module attribute lookup on every attempt
+    uniform = rng.uniform
+    
     for _ in range(config["object"]["max_collision_check_amount"]):
         # Try a random position within camera bounds
-        x = random.uniform(CAMERA_BOUNDS['x_min'], CAMERA_BOUNDS['x_max'])
-        y = random.uniform(CAMERA_BOUNDS['y_min'], CAMERA_BOUNDS['y_max'])
+        x = uniform(x_min, x_max)
+        y = uniform(y_min, y_max)
         
-        if not is_colliding((x, y, 0), existing_objects):
+        if not is_colliding((x, y, 0), occupancy, cell_size):
             return (x, y, 0)  # Return with z=0, we'll adjust height in apply_transformations
     
     return None
 
-def apply_transformations(obj, imported_objects):
+def apply_transformations(obj, occupancy, rng=random):
+    """Scale, place and rotate an imported object and add it to the occupancy grid.
+    
+    Args:
+        obj: The imported object
+        occupancy: Dict mapping grid cell keys to the objects placed in them
+        rng: Random number generator to use
+        
+    Returns:
+        The object if it was placed, None if it was removed
+    """
     dims = obj.dimensions
     max_dim = max(dims)
-    if max_dim > 0:
-        # Base scale factor
-        base_scale = config["object"]["max_scale"] / max_dim
-        # Random scale variation between 1 and 1.5
-        scale_variation = random.uniform(config["object"]["scale_variation_range"][0],
-                                            config["object"]["scale_variation_range"][1])
-        
-        # Apply random scale
-        scale_factor = base_scale * scale_variation
-        obj.scale = (scale_factor, scale_factor, scale_factor)
-        
-        # Reset all rotations first
-        obj.rotation_euler = (0, 0, 0)
-        
-        # Find a valid position that doesn't collide with existing objects
-        position = find_valid_position(imported_objects)
-        if position is None:
-            logger.warning(f"Could not find valid position for object {obj.name}, skipping...")
-            bpy.data.objects.remove(obj)
-            return None
-        
-        # Set the position
-        obj.location = position
-        
-        # Rotate the object so that it stands upright
-        obj.rotation_euler = (
-            math.radians(90),       # x rotation
-            0,                      # y rotation
-            random.uniform(0, 360)  # z rotation for random orientation
-        )
-        
-        # Update the scene to apply transformations
-        bpy.context.view_layer.update()
-        
-        # Adjust the height to ensure object sits on ground
-        # Get the object's dimensions after transformations
-        final_dims = obj.dimensions
-        # Move the object up by half its height to sit on ground
-        obj.location.z = final_dims.z / 2
-        
\ No newline at end of file
+    if max_dim <= 0:
+        # An empty mesh cannot be scaled and would be labelled at the origin
+        logger.warning(f"Object {obj.name} has no size, skipping...")
+        bpy.data.objects.remove(obj)
+        return None
+    
+    # Base scale factor
+    base_scale = config["object"]["max_scale"] / max_dim
+    # Random scale variation between 1 and 1.5
+    scale_variation = rng.uniform(config["object"]["scale_variation_range"][0],
+                                  config["object"]["scale_variation_range"][1])
+    
+    # Apply random scale
+    scale_factor = base_scale * scale_variation
+    
+    # Calculate the dimensions after scaling, the dimensions of the object are only
+    # updated once the depsgraph is evaluated after the whole scene is built
+    final_dims = tuple(dim / scale * scale_factor for dim, scale in zip(dims, obj.scale))
+    obj.scale = (scale_factor, scale_factor, scale_factor)
+    
+    # Reset all rotations first
+    obj.rotation_euler = (0, 0, 0)
+    
+    # Find a valid position that doesn't collide with existing objects
+    position = find_valid_position(occupancy, rng)
+    if position is None:
+        logger.warning(f"Could not find valid position for object {obj.name}, skipping...")
+        bpy.data.objects.remove(obj)
+        return None
+    
+    # Set the position
+    obj.location = position
+    
+    # Rotate the object so that it stands upright
+    obj.rotation_euler = (
+        math.radians(90),       # x rotation
+        0,                      # y rotation
+        rng.uniform(0, 2 * math.pi)  # z rotation for random orientation (Euler angles are in radians)
+    )
+    
+    # Adjust the height to ensure object sits on ground
+    # Move the object up by half its height to sit on ground
+    obj.location.z = final_dims[2] / 2
+    
+    add_to_occupancy(occupancy, position, final_dims)
+    return obj
@@ -1,7 +1,9 @@
+import re
 import sys
-import importlib
+import importlib.util
+import importlib.metadata
 import subprocess
-from typing import List, Optional
+from typing import List, Optional, Set
 
 from .logger_utils import logger
 
@@ -22,43 +24,78 @@ def read_package_requirements(file_path: str = "packages.txt") -> List[str]:
         logger.error(f"Requirements file not found: {file_path}")
         return []
 
-def check_package(package_name: str) -> bool:
+def normalize_package_name(package_name: str) -> str:
+    """
+    Normalize a package name so that spellings like 'Pillow', 'pillow' and 'typing_extensions' match.
+    
+    Args:
+        package_name (str): Name of the package
+        
+    Returns:
+        str: The normalized package name
+    """
+    return re.sub(r"[-_.]+", "-", package_name).lower()
+
+def get_installed_distributions() -> Set[str]:
+    """
+    Get the normalized names of all installed distributions with a single scan of the site directories.
+    
+    Returns:
+        Set[str]: Set of the normalized distribution names
+    """
+    return {normalize_package_name(dist.metadata["Name"])
+            for dist in importlib.metadata.distributions() if dist.metadata["Name"]}
+
+def check_package(package_name: str, installed: Optional[Set[str]] = None) -> bool:
     """
     Check if a package is installed.
     
+    The package is looked up by its distribution name, without importing it. If the name is not
+    a distribution name, it is looked up as a module name instead (e.g. 'PIL' of 'pillow').
+    
     Args:
         package_name (str): Name of the package to check
+        installed (Optional[Set[str]]): Names returned by get_installed_distributions, scanned if not given
         
     Returns:
         bool: True if package is installed, False otherwise
     """
-    try:
-        importlib.import_module(package_name)
+    if installed is None:
+        installed = get_installed_distributions()
+    if normalize_package_name(package_name) in installed:
         return True
-    except ImportError:
+    
+    try:
+        # Only finds the module, it is not executed
+        return importlib.util.find_spec(package_name) is not None
+    except (ImportError, ValueError):
         return False
 
-def install_package(package_name: str) -> bool:
+def install_package(*package_names: str) -> bool:
     """
-    Install a package using pip.
+    Install one or more packages using pip.
+    
+    All packages are installed by a single pip run, so pip's startup and dependency
+    resolution are only paid once.
     
     Args:
-        package_name (str): Name of the package to install
+        *package_names (str): Names of the packages to install
         
     Returns:
         bool: True if installation was successful, False otherwise
     """
+    packages = ", ".join(package_names)
     try:
         # Use sys.executable which points to the current Python interpreter
         # In Blender, this will be Blender's Python
-        subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
-        logger.info(f"Successfully installed {package_name}")
+        subprocess.check_call([sys.executable, "-m", "pip", "install", *package_names])
+        logger.info(f"Successfully installed {packages}")
         return True
     except subprocess.CalledProcessError as e:
-        logger.error(f"Failed to install {package_name}: {str(e)}")
+        logger.error(f"Failed to install {packages}: {str(e)}")
         return False
     except Exception as e:
-        logger.error(f"Unexpected error installing {package_name}: {str(e)}")
+        logger.error(f"Unexpected error installing {packages}: {str(e)}")
         return False
 
 def ensure_packages(auto_install: bool = True, requirements_file: str = "packages.txt") -> Optional[str]:
@@ -76,11 +113,9 @@ def ensure_packages(auto_install: bool = True, requirements_file: str = "package
     if not requirements:
         return "No package requirements found or error reading requirements file"
     
-    missing_packages = []
-    
-    for package in requirements:
-        if not check_package(package):
-            missing_packages.append(package)
+    # Scan the installed distributions once for all requirements
+    installed = get_installed_distributions()
+    missing_packages = [package for package in requirements if not check_package(package, installed)]
     
     if not missing_packages:
         return None
@@ -88,8 +123,7 @@ def ensure_packages(auto_install: bool = True, requirements_file: str = "package
     if not auto_install:
         return f"Missing required packages: {', '.join(missing_packages)}"
     
-    for package in missing_packages:
-        if not install_package(package):
-            return f"Failed to install package: {package}"
+    if not install_package(*missing_packages):
+        return f"Failed to install packages: {', '.join(missing_packages)}"
     
     return None 
\ No newline at end of file
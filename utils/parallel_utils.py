@@ -0,0 +1,92 @@
+"""
+Parallel Utilities for Blender Bounding Box Generator
+
+This module contains utility functions for splitting image generation across multiple Blender processes.
+"""
+# Standard Library Imports
+import os
+import subprocess
+from multiprocessing.pool import ThreadPool
+
+# Third Party Imports
+import bpy
+
+# Local Imports
+from .logger_utils import logger
+
+# Configuration
+from config import config
+
+def get_worker_slice(start_index: int,
+                     num_images: int,
+                     worker_id: int,
+                     num_workers: int) -> tuple[int, int]:
+    """
+    Calculate the range of image indices a single worker is responsible for.
+
+    The images are divided as evenly as possible, with the first workers taking one
+    extra image each when the count does not divide evenly.
+
+    Args:
+        start_index (int): The index of the first image of the whole run
+        num_images (int): The total number of images of the whole run
+        worker_id (int): The id of the worker (Between 0 and num_workers - 1)
+        num_workers (int): The total number of workers
+
+    Returns:
+        tuple[int, int]: The starting index and the number of images for the worker
+    """
+    base, remainder = divmod(num_images, num_workers)
+    worker_start = start_index + worker_id * base + min(worker_id, remainder)
+    worker_count = base + (1 if worker_id < remainder else 0)
+    return worker_start, worker_count
+
+def launch_workers(script_path: str,
+                   num_images: int,
+                   start_index: int,
+                   num_workers: int,
+                   visualise: bool,
+                   engine: str) -> list[int]:
+    """
+    Launch headless Blender worker processes which each render a disjoint slice of the images.
+
+    Args:
+        script_path (str): Path to the driver script the workers should run
+        num_images (int): The total number of images to generate
+        start_index (int): The index of the first image
+        num_workers (int): The number of Blender processes to launch
+        visualise (bool): Whether the workers should visualise the bounding boxes
+        engine (str): The name of the render engine the workers should use
+
+    Returns:
+        list[int]: The ids of the workers which exited with an error
+    """
+    gpu_ids = config["parallel"]["gpu_ids"]
+
+    def run_worker(worker_id: int) -> int:
+        command = [
+            bpy.app.binary_path, "--background", "--python", script_path, "--",
+            "--num-images", str(num_images),
+            "--starting-filename", f"image_{start_index:06d}",
+            "--worker-id", str(worker_id),
+            "--num-workers", str(num_workers),
+            "--engine", engine,
+            "--visualise" if visualise else "--no-visualise"
+        ]
+
+        # Pin each worker to a single GPU if GPU ids are configured
+        # CUDA and OptiX read the CUDA variable, HIP reads its own
+        env = dict(os.environ)
+        if gpu_ids:
+            gpu_id = str(gpu_ids[worker_id % len(gpu_ids)])
+            env["CUDA_VISIBLE_DEVICES"] = gpu_id
+            env["HIP_VISIBLE_DEVICES"] = gpu_id
+
+        logger.info("Launching worker %d: %s", worker_id, " ".join(command))
+        return subprocess.run(command, env=env).returncode
+
+    # The workers are separate processes, threads are only used to wait on them
+    with ThreadPool(num_workers) as pool:
+        return_codes = pool.map(run_worker, range(num_workers))
+
+    return [worker_id for worker_id, code in enumerate(return_codes) if code != 0]
@@ -6,59 +6,71 @@ This module contains utility functions for scene setup and management in Blender
 
 # Standard Library Imports
 import os
+import logging
 
 # Third Party Imports
 import bpy
 
 # Local Imports
 from .logger_utils import logger
+from .camera_utils import create_camera
 
 # Configuration
 from config import config
 
-def clear_scene():
-    """Remove all objects, materials, meshes and lights from the scene."""
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete()
+# Render engine identifiers by their command line names
+RENDER_ENGINES = {
+    "eevee": "BLENDER_EEVEE",
+    "cycles": "CYCLES"
+}
+
+# GPU compute types tried in order when the configured type has no devices, fastest first
+COMPUTE_DEVICE_TYPES = ('OPTIX', 'CUDA', 'HIP', 'ONEAPI', 'METAL')
+
+# Names of the materials loaded from the texture files by texture path, kept between images
+GROUND_MATERIALS = {}
+
+def get_engine_identifier(engine: str) -> str:
+    """Get the Blender render engine identifier for an engine name.
     
-    # Clear all materials
-    for material in bpy.data.materials:
-        bpy.data.materials.remove(material)
+    Blender 4.2 to 4.x names EEVEE 'BLENDER_EEVEE_NEXT', so the identifier is checked
+    against the engines the running Blender version provides.
     
-    # Clear all meshes
-    for mesh in bpy.data.meshes:
-        bpy.data.meshes.remove(mesh)
+    Args:
+        engine: The name of the engine ('eevee' or 'cycles')
         
-    # Clear all lights
-    for light in bpy.data.lights:
-        bpy.data.lights.remove(light)
+    Returns:
+        The render engine identifier
+    """
+    identifier = RENDER_ENGINES[engine]
+    available = bpy.types.RenderSettings.bl_rna.properties['engine'].enum_items.keys()
+    if identifier not in available and f"{identifier}_NEXT" in available:
+        identifier = f"{identifier}_NEXT"
+    return identifier
 
-def setup_scene():
-    """Configure scene settings for rendering."""
-    # Create a new scene with all default settings
-    scene = bpy.context.scene
-    
-    # Configure render settings
-    scene.render.engine = 'CYCLES'  # Use Cycles renderer
+def clear_scene():
+    """Remove all objects, materials, meshes and lights from the scene.
     
-    # Enable GPU rendering
-    prefs = bpy.context.preferences
-    cuda_prefs = prefs.addons['cycles'].preferences
+    The data is removed through the data API, which avoids the undo push and
+    depsgraph updates of selecting and deleting with operators.
+    """
+    # Clear all objects
+    bpy.data.batch_remove(ids=tuple(bpy.data.objects))
     
-    # Log available devices
-    logger.debug("Available Devices:")
-    for device in cuda_prefs.devices:
-        logger.debug(f"Device: {device.name}, Type: {device.type}, Use: {device.use}")
+    # Clear all materials, meshes and lights
+    bpy.data.batch_remove(ids=(*bpy.data.materials, *bpy.data.meshes, *bpy.data.lights))
+
+def setup_scene(engine: str = config["scene"]["engine"]):
+    """Configure scene settings for rendering.
     
-    # Force CUDA compute type and refresh devices
-    cuda_prefs.compute_device_type = 'CUDA'
-    cuda_prefs.refresh_devices()
+    Args:
+        engine: The name of the render engine to use ('eevee' or 'cycles')
+    """
+    # Create a new scene with all default settings
+    scene = bpy.context.scene
     
-    # Enable all available CUDA devices
-    for device in cuda_prefs.devices:
-        if device.type == 'CUDA':
-            device.use = True
-            logger.debug(f"Enabled CUDA device: {device.name}")
+    # Configure render settings
+    scene.render.engine = get_engine_identifier(engine)
     
     # Set render settings for faster preview
     scene.render.resolution_x = config["scene"]["resolution"]["x"]
@@ -66,20 +78,24 @@ def setup_scene():
     scene.render.resolution_percentage = config["scene"]["resolution"]["percentage"]
     scene.render.filepath = '//rendered_image.png'
     
-    # Optimize render settings for GPU
-    scene.cycles.device = 'GPU'
-    scene.cycles.tile_size = config["scene"]["cycles"]["tile_size"]            # Larger tile size for GPU
-    scene.cycles.samples = config["scene"]["cycles"]["sample_count"]           # Reduced samples for faster preview
-    scene.cycles.use_denoising = config["scene"]["cycles"]["use_denoising"]    # Enable denoising for cleaner results
+    # Write 8-bit RGB PNGs, the labels do not need alpha or more precision
+    image_settings = scene.render.image_settings
+    image_settings.file_format = 'PNG'
+    image_settings.color_mode = 'RGB'
+    image_settings.color_depth = '8'
+    image_settings.compression = config["scene"]["png_compression"]
     
-    # Additional GPU optimizations
-    scene.cycles.use_adaptive_sampling = config["scene"]["cycles"]["use_adaptive_sampling"]
-    scene.cycles.adaptive_threshold = config["scene"]["cycles"]["adaptive_threshold"]
-    scene.cycles.adaptive_min_samples = config["scene"]["cycles"]["adaptive_min_samples"]
-    scene.cycles.use_denoising_prefilter = config["scene"]["cycles"]["use_denoising_prefilter"]
+    # Only the combined pass is used
+    view_layer = bpy.context.view_layer
+    view_layer.use_pass_z = False
+    view_layer.use_pass_normal = False
     
-    # Force GPU compute
-    scene.cycles.feature_set = 'EXPERIMENTAL'
+    if engine == "cycles":
+        setup_cycles(scene)
+    else:
+        # EEVEE rasterises the scene, a few anti-aliasing samples are enough for the labels
+        scene.eevee.taa_render_samples = config["scene"]["eevee"]["taa_render_samples"]
+        logger.debug(f"EEVEE Samples: {scene.eevee.taa_render_samples}")
     
     # Configure view settings
     scene.view_settings.view_transform = 'Standard'  # Use standard view transform
@@ -99,17 +115,13 @@ def setup_scene():
     render_layers = nodes.new('CompositorNodeRLayers')
     composite = nodes.new('CompositorNodeComposite')
     
+    # The viewer keeps the render in memory so the visualisation does not have to read it back from disk
+    viewer = nodes.new('CompositorNodeViewer')
+    
     # Link nodes
     links = tree.links
     links.new(render_layers.outputs[0], composite.inputs[0])
-    
-    # Log render settings for verification
-    logger.debug("==== Render Settings ====")
-    logger.debug(f"Device: {scene.cycles.device}")
-    logger.debug(f"Tile Size: {scene.cycles.tile_size}")
-    logger.debug(f"Samples: {scene.cycles.samples}")
-    logger.debug(f"Denoising: {scene.cycles.use_denoising}")
-    logger.debug(f"Feature Set: {scene.cycles.feature_set}")
+    links.new(render_layers.outputs[0], viewer.inputs[0])
     
     # Adjust world settings (simple white background)
     world = bpy.data.worlds['World']
@@ -120,16 +132,233 @@ def setup_scene():
     
     return scene
 
-def create_textured_plane(texture_path=None):
-    """Create a 3x3 grid of planes with optional texture.
+def setup_render_devices():
+    """Enable the GPU devices for Cycles rendering.
+    
+    Device enumeration is slow and its result does not change during a run,
+    so this is called once before rendering instead of for every image.
+    """
+    # Enable GPU rendering
+    prefs = bpy.context.preferences
+    cuda_prefs = prefs.addons['cycles'].preferences
+    
+    # Log available devices
+    logger.debug("Available Devices:")
+    for device in cuda_prefs.devices:
+        logger.debug(f"Device: {device.name}, Type: {device.type}, Use: {device.use}")
+    
+    # Use the configured compute type, falling back to the other types in order if it has no GPU devices
+    for compute_device_type in dict.fromkeys((config["scene"]["cycles"]["compute_device_type"], *COMPUTE_DEVICE_TYPES)):
+        try:
+            cuda_prefs.compute_device_type = compute_device_type
+        except TypeError:
+            logger.warning(f"Compute device type {compute_device_type} is not supported by this Blender build")
+            continue
+        cuda_prefs.refresh_devices()
+        if any(device.type == compute_device_type for device in cuda_prefs.devices):
+            break
+        logger.warning(f"No {compute_device_type} devices found")
+    
+    # Enable all available GPU devices
+    for device in cuda_prefs.devices:
+        device.use = device.type != 'CPU'
+        if device.use:
+            logger.debug(f"Enabled {device.type} device: {device.name}")
+
+def setup_cycles(scene):
+    """Configure the Cycles render settings of the scene.
+    
+    Args:
+        scene: The Blender scene
+    """
+    # Render on the GPU if setup_render_devices enabled any GPU device, otherwise on the CPU
+    cycles_prefs = bpy.context.preferences.addons['cycles'].preferences
+    has_gpu = any(device.use and device.type != 'CPU' for device in cycles_prefs.devices)
+    scene.cycles.device = 'GPU' if has_gpu else 'CPU'
+    if not has_gpu:
+        logger.warning("No GPU devices enabled, rendering with Cycles on the CPU")
+    
+    # Cycles only needs tiles to limit memory use, so the frame is rendered untiled unless configured otherwise
+    scene.cycles.use_auto_tile = config["scene"]["cycles"]["use_auto_tile"]
+    scene.cycles.tile_size = config["scene"]["cycles"]["tile_size"]            # Larger power of two tile size for GPU
+    scene.cycles.samples = config["scene"]["cycles"]["sample_count"]           # Reduced samples for faster preview
+    scene.cycles.use_denoising = config["scene"]["cycles"]["use_denoising"]    # Enable denoising for cleaner results
+    
+    # Additional GPU optimizations
+    scene.cycles.use_adaptive_sampling = config["scene"]["cycles"]["use_adaptive_sampling"]
+    scene.cycles.adaptive_threshold = config["scene"]["cycles"]["adaptive_threshold"]
+    scene.cycles.adaptive_min_samples = config["scene"]["cycles"]["adaptive_min_samples"]
+    scene.cycles.use_denoising_prefilter = config["scene"]["cycles"]["use_denoising_prefilter"]
+    
+    # Limit the light paths, the labels do not depend on accurate indirect lighting
+    scene.cycles.max_bounces = config["scene"]["cycles"]["max_bounces"]
+    scene.cycles.diffuse_bounces = config["scene"]["cycles"]["diffuse_bounces"]
+    scene.cycles.glossy_bounces = config["scene"]["cycles"]["glossy_bounces"]
+    scene.cycles.sample_clamp_indirect = config["scene"]["cycles"]["sample_clamp_indirect"]
+    
+    # The OptiX denoiser runs on the GPU but needs OptiX devices, otherwise use Open Image Denoise
+    denoiser = config["scene"]["cycles"]["denoiser"]
+    if denoiser == 'OPTIX' and (not has_gpu or cycles_prefs.compute_device_type != 'OPTIX'):
+        denoiser = 'OPENIMAGEDENOISE'
+    scene.cycles.denoiser = denoiser
+    
+    # Keep the BVH and compiled shaders in memory between renders, the ground planes
+    # are kept between images so only the per-image objects have to be synced
+    scene.render.use_persistent_data = config["scene"]["cycles"]["use_persistent_data"]
+    if not scene.render.use_persistent_data:
+        logger.warning("Persistent data is disabled, Cycles will rebuild the whole scene for every image")
+    
+    # Only the supported features are needed, the experimental ones (e.g. adaptive subdivision) only add overhead
+    scene.cycles.feature_set = 'SUPPORTED'
+    
+    # Log render settings for verification, only read back from the scene when they will be logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("==== Render Settings ====")
+        logger.debug(f"Device: {scene.cycles.device}")
+        logger.debug(f"Tile Size: {scene.cycles.tile_size}")
+        logger.debug(f"Samples: {scene.cycles.samples}")
+        logger.debug(f"Max Bounces: {scene.cycles.max_bounces}")
+        logger.debug(f"Denoising: {scene.cycles.use_denoising}")
+        logger.debug(f"Denoiser: {scene.cycles.denoiser}")
+        logger.debug(f"Persistent Data: {scene.render.use_persistent_data}")
+        logger.debug(f"Feature Set: {scene.cycles.feature_set}")
+
+def create_plane_mesh(name, size):
+    """Create a UV mapped plane mesh directly from mesh data.
+    
+    This produces the same mesh as bpy.ops.mesh.primitive_plane_add without the
+    operator overhead (context switch, dependency graph update and undo push).
+    
+    Args:
+        name: Name of the mesh
+        size: Length of the sides of the plane
+        
+    Returns:
+        The created plane mesh
+    """
+    half_size = size / 2
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(
+        [(-half_size, -half_size, 0), (half_size, -half_size, 0), (half_size, half_size, 0), (-half_size, half_size, 0)],
+        [],
+        [(0, 1, 2, 3)]
+    )
+    
+    # Map the texture over the whole plane like the primitive does
+    uv_layer = mesh.uv_layers.new(name="UVMap")
+    uv_layer.data.foreach_set("uv", (0, 0, 1, 0, 1, 1, 0, 1))
+    mesh.update()
+    return mesh
+
+def create_plane(name, size, location, mesh=None):
+    """Create a plane object.
+    
+    Args:
+        name: Name of the plane object and its mesh
+        size: Length of the sides of the plane
+        location: Tuple of (x, y, z) coordinates of the plane center
+        mesh: Plane mesh to use, shared with other planes of the same size (A new mesh is created if None)
+        
+    Returns:
+        The created plane object
+    """
+    if mesh is None:
+        mesh = create_plane_mesh(name, size)
+    
+    plane = bpy.data.objects.new(name, mesh)
+    plane.location = location
+    bpy.context.collection.objects.link(plane)
+    return plane
+
+def create_ground_material(texture_path=None):
+    """Create the material of the ground planes.
+    
+    A texture file is only loaded the first time it is used, its material is kept between
+    images and reused when the texture is chosen again.
     
     Args:
         texture_path: Path to the texture file (.blend)
+        
+    Returns:
+        The first material of the texture file, or a plain material using the default colour
+        if the texture is missing or cannot be loaded
+    """
+    mat = bpy.data.materials.get(GROUND_MATERIALS.get(texture_path, ""))
+    if mat is not None and mat.get("texture_path") == texture_path:
+        return mat
+    
+    if texture_path and os.path.exists(texture_path):
+        try:
+            # Append the material from the .blend file
+            with bpy.data.libraries.load(texture_path) as (data_from, data_to):
+                # Find material names in the .blend file
+                material_names = [name for name in data_from.materials]
+                if material_names:
+                    # Load the first material found
+                    data_to.materials = [material_names[0]]
+            
+            if data_to.materials and data_to.materials[0] is not None:
+                logger.info(f"Successfully loaded material from: {texture_path}")
+                mat = data_to.materials[0]
+                
+                # Keep the material when the planes switch to another texture
+                mat["texture_path"] = texture_path
+                mat.use_fake_user = True
+                GROUND_MATERIALS[texture_path] = mat.name
+                return mat
+            
+            raise Exception("No valid materials found in the .blend file")
+            
+        except Exception as e:
+            logger.error(f"Error applying material from .blend file: {str(e)}")
+    
+    # Fallback to a default material if there is no texture or it failed to load,
+    # reusing the one built for an earlier image instead of rebuilding its node tree
+    mat = bpy.data.materials.get("Ground_Material")
+    if mat is not None:
+        return mat
+    
+    mat = bpy.data.materials.new(name="Ground_Material")
+    # Keep it through the orphan purge between images, like the textured ground materials
+    mat.use_fake_user = True
+    mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    links = mat.node_tree.links
+    
+    # Clear existing nodes
+    nodes.clear()
+    
+    # Create nodes for texture setup
+    material_output = nodes.new('ShaderNodeOutputMaterial')
+    principled_bsdf = nodes.new('ShaderNodeBsdfPrincipled')
+    
+    # Link Principled BSDF to Material Output
+    links.new(principled_bsdf.outputs['BSDF'], material_output.inputs['Surface'])
+    principled_bsdf.inputs[0].default_value = config["object"]["default_colour"]
+    
+    return mat
+
+def get_ground_planes():
+    """Get the ground plane objects of the scene.
+    
+    Returns:
+        List of the ground plane objects
+    """
+    return [obj for obj in bpy.data.objects if obj.name.startswith("Background_Plane")]
+
+def create_ground_planes():
+    """Create a 3x3 grid of ground planes without a material.
+    
+    Returns:
+        List of the created planes
     """
     planes = []
     plane_size = config["scene"]["grid"]["size"] # Size of each individual plane
     spacing = plane_size  # Planes will touch perfectly
     
+    # All planes have the same size and material, so they share a single mesh
+    mesh = create_plane_mesh("Background_Plane", plane_size)
+    
     # Create a plane grid
     for i in range(3):
         for j in range(3):
@@ -137,69 +366,74 @@ def create_textured_plane(texture_path=None):
             x = (i - 1) * spacing  # -1, 0, 1
             y = (j - 1) * spacing  # -1, 0, 1
             
-            # Create the plane
-            bpy.ops.mesh.primitive_plane_add(size=plane_size, location=(x, y, 0))
-            plane = bpy.context.active_object
-            
-            # Set plane name for easy identification
-            plane.name = f"Background_Plane_{i}_{j}"
-            
-            # Create material
-            mat = bpy.data.materials.new(name=f"Ground_Material_{i}_{j}")
-            mat.use_nodes = True
-            nodes = mat.node_tree.nodes
-            links = mat.node_tree.links
-            
-            # Clear existing nodes
-            nodes.clear()
-            
-            # Create nodes for texture setup
-            material_output = nodes.new('ShaderNodeOutputMaterial')
-            principled_bsdf = nodes.new('ShaderNodeBsdfPrincipled')
-            
-            # Link Principled BSDF to Material Output
-            links.new(principled_bsdf.outputs['BSDF'], material_output.inputs['Surface'])
-            
-            if texture_path and os.path.exists(texture_path):
-                try:
-                    # Append the material from the .blend file
-                    with bpy.data.libraries.load(texture_path) as (data_from, data_to):
-                        # Find material names in the .blend file
-                        material_names = [name for name in data_from.materials]
-                        if material_names:
-                            # Load the first material found
-                            data_to.materials = [material_names[0]]
-                    
-                    if data_to.materials and data_to.materials[0] is not None:
-                        # Use the loaded material instead of creating a new one
-                        imported_mat = data_to.materials[0]
-                        
-                        # Assign the imported material to the plane
-                        if plane.data.materials:
-                            plane.data.materials[0] = imported_mat
-                        else:
-                            plane.data.materials.append(imported_mat)
-                        
-                        logger.info(f"Successfully applied material from: {texture_path}")
-                        planes.append(plane)
-                        continue
-                    
-                    raise Exception("No valid materials found in the .blend file")
-                    
-                except Exception as e:
-                    logger.error(f"Error applying material from .blend file: {str(e)}")
-                    # Fallback to default material if texture fails
-                    principled_bsdf.inputs[0].default_value = config["object"]["default_colour"]
-            else:
-                # Fallback to default again
-                principled_bsdf.inputs[0].default_value = config["object"]["default_colour"]
-            
-            # Assign material to plane (only if we didn't successfully import a material)
-            if plane.data.materials:
-                plane.data.materials[0] = mat
-            else:
-                plane.data.materials.append(mat)
-            
-            planes.append(plane)
+            # Create the plane, named for easy identification
+            planes.append(create_plane(f"Background_Plane_{i}_{j}", plane_size, (x, y, 0), mesh))
+    
+    return planes
+
+def set_ground_material(planes, texture_path=None):
+    """Apply the texture to the ground planes.
+    
+    All planes share a single material, so the texture file is only loaded once.
+    
+    Args:
+        planes: The ground plane objects
+        texture_path: Path to the texture file (.blend)
+    """
+    mat = create_ground_material(texture_path)
+    
+    # The planes usually share a mesh, so each mesh is only updated once
+    for mesh in {plane.data for plane in planes}:
+        if mesh.materials:
+            mesh.materials[0] = mat
+        else:
+            mesh.materials.append(mat)
+
+def create_textured_plane(texture_path=None):
+    """Create a 3x3 grid of planes with optional texture.
+    
+    Args:
+        texture_path: Path to the texture file (.blend)
+    """
+    planes = create_ground_planes()
+    set_ground_material(planes, texture_path)
+    return planes
+
+def ensure_scene(engine: str = config["scene"]["engine"]):
+    """Set up the parts of the scene which are the same for every image.
+    
+    The render settings, camera and ground planes are only created on the first call, and
+    again if they were removed (e.g. while recovering from an error) or the engine changed.
+    
+    Args:
+        engine: The name of the render engine to use ('eevee' or 'cycles')
+        
+    Returns:
+        Tuple of (scene, camera, ground planes)
+    """
+    scene = bpy.context.scene
+    planes = get_ground_planes()
+    if scene.get("generator_engine") == engine and scene.camera is not None and len(planes) == 9:
+        return scene, scene.camera, planes
+    
+    logger.info("Setting up the scene")
+    clear_scene()
+    scene = setup_scene(engine)
+    camera = create_camera()
+    planes = create_ground_planes()
+    
+    # Remember the engine the scene was set up for
+    scene["generator_engine"] = engine
+    return scene, camera, planes
+
+def reset_frame_state():
+    """Remove the objects and lights of the last image, keeping the camera and ground planes."""
+    scene = bpy.context.scene
+    persistent = {plane.name for plane in get_ground_planes()}
+    if scene.camera is not None:
+        persistent.add(scene.camera.name)
+    
+    bpy.data.batch_remove(ids=[obj for obj in bpy.data.objects if obj.name not in persistent])
     
-    return planes 
+    # Remove the meshes, materials and lights left without users
+    bpy.data.orphans_purge(do_local_ids=True, do_linked_ids=True, do_recursive=True)